@@ -7,28 +7,187 @@ import os
 import re
 import json
 import time
+import logging
+from json.encoder import encode_basestring_ascii
 import asyncio
+import functools
+import itertools
 import threading
+from array import array
+from collections import Counter
 import webbrowser
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
 import webview
-from logger import get_logger
+from peewee import chunked, fn, Case, SQL
+from logger import get_logger, debug_log, DEBUG_LOG_ENABLED
 from browser_manager import BrowserManager
 from toutiao_client import ToutiaoClient
-from article_downloader import ArticleDownloader, fetch_article_elements, read_docx_elements, generate_docx, safe_filename, _is_huiwen_url, _is_people_url, is_supported_url
-from rewrite_client import RewriteClient, SensitiveContentError
-from models import Account, Setting, Article, save_articles, db, _write_lock
+from article_downloader import ArticleDownloader, read_docx_elements, generate_docx, safe_filename, _is_huiwen_url, _is_people_url, is_supported_url
+from rewrite_client import RewriteClient, RewriteCancelled, SensitiveContentError, TokenBucket, call_with_backoff
+from models import Account, Setting, Article, BatchCommitter, save_articles, apply_article_changes, set_doc_paths, db, db_session, _write_lock
 from task_manager import TaskManager
 from runtime_paths import configure_playwright_env
 
 log = get_logger('api')
 
+# uvloop 为可选依赖（不支持 Windows），装了就用，没装退回标准事件循环
+try:
+    import uvloop
+    _new_event_loop = uvloop.new_event_loop
+except ImportError:
+    _new_event_loop = asyncio.new_event_loop
+
+
+def _split_text_elements(elements):
+    """分离文字元素，返回 (text_indices, paragraphs, total_chars)"""
+    text_indices = array('i')
+    paragraphs = []
+    # 预先绑定 append，循环内省去属性查找
+    add_index = text_indices.append
+    add_paragraph = paragraphs.append
+    for i, elem in enumerate(elements):
+        if elem['type'] == 'text':
+            add_index(i)
+            add_paragraph(elem['text'])
+    # 总字数用 C 层的 sum(map(len)) 统计，比在循环里逐段累加更快
+    return text_indices, paragraphs, sum(map(len, paragraphs))
+
+
+def _int_setting(settings, key, default, low, high):
+    """
+    读取整数设置并限制在 [low, high]
+    前端清空 v-model.number 输入框时会存成 '' 或 None，取不到合法整数时用默认值
+    """
+    try:
+        value = int(settings.get(key, default))
+    except (TypeError, ValueError):
+        value = default
+    return min(max(value, low), high)
+
+
+def _js_args(args):
+    """把一组 Python 值编码为 JS 调用参数列表"""
+    return ', '.join(encode_basestring_ascii(a) if isinstance(a, str) else json.dumps(a) for a in args)
+
+
+# 记录日志时需要打码的设置项
+_SECRET_SETTING_KEYS = frozenset(('apiKey',))
+
+
+# 头条文章 ID：/article/<id>、/a<id>、/i<id>，或任意 15 位以上数字，一次扫描取最左匹配
+_URL_ID_RE = re.compile(r'/article/(\d+)|/[ai](\d{10,})|(\d{15,})')
+# 人民号文章 ID：/n/<id>
+_PEOPLE_ID_RE = re.compile(r'/n/(\w+)')
+# 链接转 group_id 时替换掉的非单词字符
+_NON_WORD_RE = re.compile(r'[^\w]')
+# 批量下载按并发轮数限时，每轮（单篇）按此秒数估算
+_DOWNLOAD_ROUND_TIMEOUT = 120
+
+
+class _ThrottledProgress:
+    """
+    进度回调节流：高频 emit 合并为每 interval 秒最多一次 JS 调用，只发送最新一条
+    参数在真正发送时才编码，结束时调用 flush() 补发最后一条
+    用 run_js 发送：不等待也不回传 JS 返回值，省去 evaluate_js 的结果序列化和往返等待
+    发送一律放在定时器线程里做（到点了也用 0 延迟的定时器），emit / flush 的调用方
+    可能是 Playwright 所在的 API 事件循环，不能在调用方线程上跑 run_js
+    """
+
+    def __init__(self, window, js_func, interval=0.1):
+        self._window = window
+        self._prefix = f'window.{js_func} && window.{js_func}('
+        self._interval = interval
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()  # 串行发送，先取到旧参数的线程不会覆盖后来的新进度
+        self._pending = None
+        self._timer = None
+        self._last = 0.0
+
+    def emit(self, *args):
+        if not self._window:
+            return
+        with self._lock:
+            self._pending = args
+            if self._timer is None:
+                delay = self._interval - (time.monotonic() - self._last)
+                self._start_timer(max(delay, 0))
+
+    def flush(self):
+        """立即补发最后一条（同样在定时器线程发送，不阻塞调用方）"""
+        with self._lock:
+            if self._pending is None:
+                return
+            if self._timer is not None:
+                self._timer.cancel()
+            self._start_timer(0)
+
+    def _start_timer(self, delay):
+        # 调用方需持有 self._lock
+        self._timer = threading.Timer(delay, self._send)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _send(self):
+        with self._send_lock:
+            with self._lock:
+                args, self._pending = self._pending, None
+                if self._timer is not None and self._timer.ident == threading.get_ident():
+                    self._timer = None
+                if args is None:
+                    return
+                self._last = time.monotonic()
+            try:
+                self._window.run_js(self._prefix + _js_args(args) + ')')
+            except Exception:
+                pass
+
+
+# 文章列表接口返回的字段，与 Article.to_dict() 一致
+_ARTICLE_LIST_FIELDS = [f for f in Article._meta.sorted_fields if f.name != 'updated_at']
+
+
+def _paginate_with_total(query, page, page_size):
+    """
+    分页查询文章字典并用 COUNT(*) OVER () 在同一条语句里带回总数，返回 (items, total)
+    直接取 dict 行，不实例化 Article 对象
+    """
+    items = list(query.select(
+        *_ARTICLE_LIST_FIELDS, fn.COUNT(SQL('*')).over().alias('_total')
+    ).paginate(page, page_size).dicts())
+    if not items:
+        # 页码越界时窗口函数拿不到总数，退回单独计数
+        return items, (query.count() if page > 1 else 0)
+    total = items[0]['_total']
+    for item in items:
+        del item['_total']
+        created_at = item['created_at']
+        item['created_at'] = created_at.strftime('%Y-%m-%d %H:%M:%S') if created_at else ''
+    return items, total
+
+
+def _account_profile_dicts():
+    """按创建时间读取全部账号详情为字典列表（字段同 Account.to_dict()），不实例化 Account 对象"""
+    profiles = list(Account.select().order_by(Account.created_at).dicts())
+    for p in profiles:
+        for key in ('created_at', 'updated_at'):
+            value = p[key]
+            p[key] = value.strftime('%Y-%m-%d %H:%M:%S') if value else ''
+    return profiles
+
+
 class Api:
     DEFAULT_SETTINGS = {
         'headless': False,
         'timeout': 30000,
         'collectTimeout': 60,
         'rewriteWorkers': 10,
+        'downloadConcurrency': 4,
         'maxWordCount': 1000,
+        'rewriteMaxRetries': 3,
+        'rewriteBackoffBase': 2,
+        'rewriteBackoffCap': 60,
+        'perTaskTimeout': 300,
         'apiBase': '',
         'apiKey': '',
         'model': '',
@@ -41,10 +200,28 @@ class Api:
         self._window = None
         self._browser_manager = BrowserManager()
         self._toutiao_client = ToutiaoClient()
-        self._settings = Setting.get_all(self.DEFAULT_SETTINGS)
+        self._apply_settings(Setting.get_all(self.DEFAULT_SETTINGS))
         self._collect_results = []
         self._task_manager = TaskManager()
-        self._loop = asyncio.new_event_loop()
+        # 常驻文章下载器（共享浏览器），只在 self._loop 中使用
+        self._downloader = None
+        # 账号链接缓存（按创建时间排序），账号表写入后失效
+        self._account_urls = None
+        self._account_gen = 0
+        self._account_lock = threading.Lock()
+        # 上次在文件夹对话框中选择的目录
+        self._last_folder = ''
+        # 批量改写停止信号
+        self._rewrite_stop = threading.Event()
+        # 单篇改写复用的客户端（保持 HTTP keep-alive），模型配置变化时重建
+        self._rewrite_client = None
+        self._rewrite_client_key = None
+        self._rewrite_client_lock = threading.Lock()
+        self._loop = _new_event_loop()
+        # 限制 run_in_executor 默认线程池大小，避免按 CPU 数放大线程
+        self._loop.set_default_executor(ThreadPoolExecutor(max_workers=8, thread_name_prefix='api-loop'))
+        # 预先绑定事件循环，_run_async 每次提交少两次属性查找
+        self._submit = functools.partial(asyncio.run_coroutine_threadsafe, loop=self._loop)
         self._thread = threading.Thread(target=self._run_loop, daemon=True)
         self._thread.start()
         log.info('API 初始化完成')
@@ -56,8 +233,116 @@ class Api:
 
     def _run_async(self, coro, timeout=120):
         """在事件循环中执行异步操作并等待结果"""
-        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
-        return future.result(timeout=timeout)
+        return self._submit(coro).result(timeout=timeout)
+
+    async def _get_downloader(self, headless):
+        """获取常驻下载器，headless 设置变化时换新浏览器（旧浏览器等在途抓取结束后再关）"""
+        if self._downloader is None:
+            self._downloader = ArticleDownloader()
+        await self._downloader.start(headless)
+        return self._downloader
+
+    async def _fetch_elements(self, article_url, headless, proxy_pool):
+        """用常驻下载器的浏览器抓取文章元素（只在 self._loop 中调用）"""
+        downloader = await self._get_downloader(headless)
+        return await downloader.fetch_elements(article_url, headless=headless, proxy_pool=proxy_pool)
+
+    def _download_batch(self, articles, concurrency, progress, progress_base=0, progress_total=None):
+        """
+        用常驻下载器在 self._loop 中并发下载一批文章，每篇完成即交给 BatchCommitter 回写 doc_path / char_count
+        整批按并发轮数 × _DOWNLOAD_ROUND_TIMEOUT 限时，超时则取消未完成的下载并等它们退出，已完成的结果照常保留
+
+        Returns:
+            (results, timed_out): results 为 {article_id: doc_path 或异常}，只含已结束的文章，
+            回写数据库失败的记为异常；timed_out 表示整批是否超时被取消
+        """
+        save_path = self._article_save_path
+        headless = self._headless
+        proxy_pool = self._proxy_pool
+        total = progress_total or len(articles)
+        results = {}
+        started = 0
+        committer = BatchCommitter(set_doc_paths)
+
+        async def _download_one(downloader, sem, article):
+            nonlocal started
+            async with sem:
+                started += 1
+                current = progress_base + started
+                # 通知前端进度（节流）
+                progress.emit(article.id, article.title[:30], current, total)
+                log.info(f'下载 [{current}/{total}]: id={article.id}, title={article.title[:30]}')
+                try:
+                    doc_path, char_count = await downloader.download_with_count(
+                        article_url=article.url,
+                        save_dir=save_path,
+                        category=article.category,
+                        title=article.title,
+                        headless=headless,
+                        proxy_pool=proxy_pool,
+                    )
+                except Exception as e:
+                    log.error(f'下载失败: id={article.id}, err={e}')
+                    results[article.id] = e
+                    return
+            results[article.id] = doc_path
+            committer.put((article.id, doc_path, char_count))
+            log.info(f'下载完成: {doc_path}')
+
+        async def _download_all():
+            sem = asyncio.Semaphore(concurrency)
+            downloader = await self._get_downloader(headless)
+            await asyncio.gather(*[_download_one(downloader, sem, a) for a in articles])
+
+        async def _download_all_with_timeout():
+            # 在事件循环内限时：wait_for 超时会取消 gather 并等子任务都退出，之后才关闭 committer
+            try:
+                await asyncio.wait_for(_download_all(), timeout)
+                return False
+            except asyncio.TimeoutError:
+                return True
+
+        timeout = _DOWNLOAD_ROUND_TIMEOUT * max(1, -(-len(articles) // concurrency))
+        try:
+            # 外层多留余量给取消后的收尾（关闭页面 context）
+            timed_out = self._run_async(_download_all_with_timeout(), timeout=timeout + 60)
+        finally:
+            failed = committer.close()
+        for article_id, _, _ in failed:
+            results[article_id] = RuntimeError('下载结果写入数据库失败')
+        if timed_out:
+            log.warning(f'下载整批超时（{timeout}s），已取消 {len(articles) - len(results)} 篇未完成的下载')
+        return results, timed_out
+
+    def close_downloader(self):
+        """关闭常驻下载器的浏览器"""
+        try:
+            if self._downloader is not None:
+                self._run_async(self._downloader.close())
+            return {'success': True, 'message': '下载器已关闭'}
+        except Exception as e:
+            log.error(f'关闭下载器失败: {e}')
+            return {'success': False, 'message': str(e)}
+
+    def _get_rewrite_client(self, api_base, api_key, model, timeout):
+        """获取单篇改写共用的 RewriteClient，配置与上次不同时关闭旧的并重建"""
+        key = (api_base, api_key, model, timeout)
+        with self._rewrite_client_lock:
+            if self._rewrite_client_key != key:
+                if self._rewrite_client is not None:
+                    self._rewrite_client.close()
+                self._rewrite_client = RewriteClient(api_base, api_key, model, timeout=timeout)
+                self._rewrite_client_key = key
+            return self._rewrite_client
+
+    @staticmethod
+    def _rewrite_backoff(settings):
+        """改写重试参数（见 call_with_backoff）"""
+        return {
+            'max_retries': settings.get('rewriteMaxRetries', 3),
+            'base': settings.get('rewriteBackoffBase', 2),
+            'cap': settings.get('rewriteBackoffCap', 60),
+        }
 
     def set_window(self, window):
         """设置 pywebview 窗口引用"""
@@ -73,7 +358,7 @@ class Api:
             log.info('启动浏览器...')
             self._run_async(
                 self._browser_manager.launch(
-                    headless=self._settings.get('headless', False),
+                    headless=self._headless,
                     chrome_path=self._settings.get('chromePath', ''),
                     user_data_dir=self._settings.get('userDataDir', './browser_data'),
                 )
@@ -131,16 +416,52 @@ class Api:
 
     ACCOUNT_URL_PREFIX = 'https://www.toutiao.com/c/user/token/'
 
+    def _read_account_urls(self):
+        """读取全部账号链接（按创建时间排序），命中缓存时不访问数据库"""
+        with self._account_lock:
+            if self._account_urls is not None:
+                return list(self._account_urls)
+            gen = self._account_gen
+        with db_session():
+            urls = [url for (url,) in Account.select(Account.url).order_by(Account.created_at, Account.id).tuples()]
+        with self._account_lock:
+            # 查询期间如有写入，结果可能已过期，不写回缓存
+            if gen == self._account_gen:
+                self._account_urls = urls
+        return list(urls)
+
+    def _invalidate_account_urls(self):
+        """账号表发生写入后调用，使缓存失效"""
+        with self._account_lock:
+            self._account_gen += 1
+            self._account_urls = None
+
+    def _apply_account_change(self, added=(), removed=()):
+        """
+        账号增删后就地更新缓存并返回最新列表，省去重新查询
+        新增账号创建时间最晚，追加到末尾即保持排序；缓存未建立时回退为查询
+        """
+        with self._account_lock:
+            # 同样推进版本号，丢弃写入前发起的查询结果
+            self._account_gen += 1
+            if self._account_urls is not None:
+                urls = self._account_urls
+                if removed:
+                    drop = set(removed)
+                    urls = [u for u in urls if u not in drop]
+                self._account_urls = urls + list(added)
+                return list(self._account_urls)
+        return self._read_account_urls()
+
     def get_accounts(self):
         """获取所有对标账号列表"""
         try:
-            db.connect(reuse_if_open=True)
-            rows = Account.select().order_by(Account.created_at)
-            accounts = [r.url for r in rows]
+            accounts = self._read_account_urls()
             return {'success': True, 'accounts': accounts}
         except Exception as e:
             return {'success': False, 'message': str(e), 'accounts': []}
 
+    @db_session()
     def add_accounts(self, text):
         """批量添加对标账号"""
         try:
@@ -148,8 +469,7 @@ class Api:
             if not raw_items:
                 return {'success': False, 'message': '内容不能为空'}
 
-            db.connect(reuse_if_open=True)
-            existing = {r.url for r in Account.select(Account.url)}
+            existing = set(self._read_account_urls())
 
             added = []
             skipped = []
@@ -164,11 +484,14 @@ class Api:
                     existing.add(item)
 
             if added:
+                rows = [{'url': url} for url in added]
                 with _write_lock, db.atomic():
-                    for url in added:
-                        Account.create(url=url, category='')
-
-            all_accounts = [r.url for r in Account.select().order_by(Account.created_at)]
+                    # 每行 9 个绑定参数，100 行一批避开旧版 SQLite 999 个变量的上限
+                    for batch in chunked(rows, 100):
+                        Account.insert_many(batch, fields=[Account.url]).execute()
+                all_accounts = self._apply_account_change(added=added)
+            else:
+                all_accounts = self._read_account_urls()
 
             parts = []
             if added:
@@ -190,27 +513,28 @@ class Api:
         except Exception as e:
             return {'success': False, 'message': str(e)}
 
+    @db_session()
     def clear_accounts(self):
         """清空所有账号"""
         try:
-            db.connect(reuse_if_open=True)
             with _write_lock:
                 Account.delete().execute()
+            self._invalidate_account_urls()
             log.info('清空所有账号')
             return {'success': True, 'message': '已清空全部账号', 'accounts': []}
         except Exception as e:
             log.error(f'清空账号失败: {e}')
             return {'success': False, 'message': str(e)}
 
+    @db_session()
     def remove_account(self, account):
         """删除一个对标账号"""
         try:
             account = account.strip()
-            db.connect(reuse_if_open=True)
             with _write_lock:
                 rows = Account.delete().where(Account.url == account).execute()
             if rows:
-                all_accounts = [r.url for r in Account.select().order_by(Account.created_at)]
+                all_accounts = self._apply_account_change(removed=(account,))
                 return {'success': True, 'message': '删除成功', 'accounts': all_accounts}
             return {'success': False, 'message': '账号不存在'}
         except Exception as e:
@@ -219,8 +543,7 @@ class Api:
     def export_accounts(self):
         """导出所有对标账号链接为txt文件"""
         try:
-            db.connect(reuse_if_open=True)
-            accounts = [r.url for r in Account.select().order_by(Account.created_at)]
+            accounts = self._read_account_urls()
             if not accounts:
                 return {'success': False, 'message': '没有账号可导出'}
 
@@ -296,6 +619,7 @@ class Api:
             log.error(f'获取账号信息失败: {url} - {e}')
             return {'success': False, 'message': str(e)}
 
+    @db_session()
     def fetch_and_save_account_profile(self, url):
         """获取账号信息并立即保存到数据库"""
         try:
@@ -303,7 +627,6 @@ class Api:
             log.info(f'[线程 {threading.current_thread().name}] 开始处理账号: {url}')
 
             # 检查是否已存在
-            db.connect(reuse_if_open=True)
             existing = Account.get_or_none(Account.url == url)
             if existing:
                 log.info(f'[线程 {threading.current_thread().name}] 账号已存在数据库，跳过')
@@ -341,6 +664,7 @@ class Api:
                     follow_count=profile.get('follow_count', ''),
                     auth_info=profile.get('auth_info', ''),
                 )
+            self._invalidate_account_urls()
 
             log.info(f'[线程 {threading.current_thread().name}] ✓ 账号信息已成功保存到数据库')
             log.info('='*60)
@@ -389,10 +713,10 @@ class Api:
         """同步版本：获取账号信息"""
         return self._run_async(self.fetch_account_profile(url), timeout=60)
 
+    @db_session()
     def save_account_profile(self, url, profile_data):
         """保存账号信息到数据库"""
         try:
-            db.connect(reuse_if_open=True)
             from datetime import datetime
             with _write_lock, db.atomic():
                 AccountProfile.insert(
@@ -421,43 +745,49 @@ class Api:
             log.error(f'保存账号信息失败: {e}')
             return {'success': False, 'message': str(e)}
 
+    @db_session()
     def get_account_profiles(self):
         """获取所有账号详细信息"""
         try:
-            db.connect(reuse_if_open=True)
-            profiles = [p.to_dict() for p in Account.select().order_by(Account.created_at)]
+            profiles = _account_profile_dicts()
             return {'success': True, 'profiles': profiles}
         except Exception as e:
             return {'success': False, 'message': str(e), 'profiles': []}
 
+    @db_session()
     def import_accounts(self, data):
         """导入账号数据（JSON格式）"""
         try:
-            db.connect(reuse_if_open=True)
-            imported = 0
-            skipped = 0
-
-            with _write_lock, db.atomic():
-                for item in data:
-                    url = item.get('url')
-                    if not url:
-                        continue
-
-                    existing = Account.get_or_none(Account.url == url)
-                    if existing:
-                        skipped += 1
-                        continue
+            rows = []
+            seen = set()
+            total = 0
+            for item in data:
+                url = item.get('url')
+                if not url:
+                    continue
+                total += 1
+                if url in seen:
+                    continue
+                seen.add(url)
+                rows.append({
+                    'url': url,
+                    'name': item.get('name', ''),
+                    'avatar': item.get('avatar', ''),
+                    'fans_count': item.get('fans_count', ''),
+                    'like_count': item.get('like_count', ''),
+                    'follow_count': item.get('follow_count', ''),
+                    'auth_info': item.get('auth_info', ''),
+                })
 
-                    Account.create(
-                        url=url,
-                        name=item.get('name', ''),
-                        avatar=item.get('avatar', ''),
-                        fans_count=item.get('fans_count', ''),
-                        like_count=item.get('like_count', ''),
-                        follow_count=item.get('follow_count', ''),
-                        auth_info=item.get('auth_info', ''),
-                    )
-                    imported += 1
+            imported = 0
+            if rows:
+                with _write_lock, db.atomic():
+                    # 已存在的链接由唯一索引忽略；每行 9 个绑定参数，100 行一批避开 999 个变量的上限
+                    for batch in chunked(rows, 100):
+                        imported += Account.insert_many(batch).on_conflict_ignore().as_rowcount().execute()
+            skipped = total - imported
+            if imported:
+                self._invalidate_account_urls()
 
             log.info(f'导入账号完成 - 成功: {imported}, 跳过: {skipped}')
             return {'success': True, 'message': f'成功导入 {imported} 个账号，跳过 {skipped} 个重复'}
@@ -465,23 +795,24 @@ class Api:
             log.error(f'导入账号失败: {e}')
             return {'success': False, 'message': str(e)}
 
+    @db_session()
     def delete_all_accounts(self):
         """删除所有账号"""
         try:
-            db.connect(reuse_if_open=True)
             with _write_lock:
                 count = Account.delete().execute()
+            self._invalidate_account_urls()
             log.info(f'删除所有账号: {count} 条')
             return {'success': True, 'message': f'已删除 {count} 个账号'}
         except Exception as e:
             log.error(f'删除账号失败: {e}')
             return {'success': False, 'message': str(e)}
 
+    @db_session()
     def export_accounts_json(self):
         """导出所有账号为JSON文件到桌面"""
         try:
-            db.connect(reuse_if_open=True)
-            profiles = [p.to_dict() for p in Account.select().order_by(Account.created_at)]
+            profiles = _account_profile_dicts()
 
             if not profiles:
                 return {'success': False, 'message': '没有数据可导出'}
@@ -519,35 +850,57 @@ class Api:
     # 设置 API（持久化到数据库 settings 表）
     # ------------------------------------------
 
+    @db_session()
     def save_settings(self, settings):
         """保存设置"""
         try:
             if isinstance(settings, str):
                 settings = json.loads(settings)
-            self._settings.update(settings)
-            Setting.save_all(self._settings)
+            merged = dict(self._settings)
+            merged.update(settings)
+            Setting.save_all(merged)
+            self._apply_settings(merged)
             log.info('设置已保存')
-            log.debug(f'当前设置: { {k: ("***" if "key" in k.lower() else v) for k, v in self._settings.items()} }')
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug(f'当前设置: { {k: ("***" if k in _SECRET_SETTING_KEYS else v) for k, v in self._settings.items()} }')
             return {'success': True, 'message': '设置已保存'}
         except Exception as e:
             log.error(f'保存设置失败: {e}')
             return {'success': False, 'message': str(e)}
 
+    def _apply_settings(self, settings):
+        """
+        设置快照只读，保存时整体替换（写时复制），读方无需加锁
+        各接口频繁读取的几项同时展开为实例属性
+        """
+        self._settings = MappingProxyType(settings)
+        self._headless = settings.get('headless', False)
+        self._proxy_pool = settings.get('proxyPool', '')
+        self._collect_timeout = settings.get('collectTimeout', 60)
+        self._article_save_path = settings.get('articleSavePath', '')
+
     def get_settings(self):
         """获取当前设置"""
-        return {'success': True, 'settings': self._settings}
+        return {'success': True, 'settings': dict(self._settings)}
 
     def select_folder(self):
         """打开系统文件夹选择对话框，返回用户选择的路径"""
         try:
             if not self._window:
                 return {'success': False, 'message': '窗口未就绪'}
+            # 从上次选择的目录或已配置的保存路径打开，省得对话框从头枚举用户目录
+            start_dir = ''
+            for candidate in (self._last_folder, self._article_save_path, self._settings.get('rewriteSavePath', '')):
+                if candidate and os.path.isdir(candidate):
+                    start_dir = candidate
+                    break
             result = self._window.create_file_dialog(
                 webview.FOLDER_DIALOG,
-                directory='',
+                directory=start_dir,
             )
             if result and len(result) > 0:
                 folder_path = result[0]
+                self._last_folder = folder_path
                 log.info(f'用户选择文件夹: {folder_path}')
                 return {'success': True, 'path': folder_path}
             return {'success': False, 'message': '未选择文件夹'}
@@ -563,17 +916,13 @@ class Api:
         """采集单个账号的文章数据，支持时间范围过滤 + 自动下滑加载"""
         try:
             log.info(f'开始采集: {account_url} (since={since_time}, until={until_time})')
-            headless = self._settings.get('headless', False)
-            collect_timeout = self._settings.get('collectTimeout', 60)
+            headless = self._headless
+            collect_timeout = self._collect_timeout
+
+            progress = _ThrottledProgress(self._window, '__onCollectProgress')
 
             def on_progress(message, count):
-                if self._window:
-                    try:
-                        self._window.evaluate_js(
-                            f'window.__onCollectProgress && window.__onCollectProgress({json.dumps(message)}, {count})'
-                        )
-                    except Exception:
-                        pass
+                progress.emit(message, count)
 
             async def _do_collect():
                 if not self._toutiao_client.is_running:
@@ -589,7 +938,10 @@ class Api:
                 )
                 return result
 
-            articles = self._run_async(_do_collect())
+            try:
+                articles = self._run_async(_do_collect())
+            finally:
+                progress.flush()
             self._collect_results = articles
             summary = self._toutiao_client.get_summary()
 
@@ -653,8 +1005,8 @@ class Api:
             if not accounts:
                 return {'success': False, 'message': f'类型「{type_name}」下没有账号'}
 
-            collect_timeout = self._settings.get('collectTimeout', 60)
-            headless = self._settings.get('headless', False)
+            collect_timeout = self._collect_timeout
+            headless = self._headless
 
             # 构建任务列表
             task_items = [
@@ -685,8 +1037,8 @@ class Api:
             if not tasks:
                 return {'success': False, 'message': '请至少添加一个采集类目'}
 
-            collect_timeout = self._settings.get('collectTimeout', 60)
-            headless = self._settings.get('headless', False)
+            collect_timeout = self._collect_timeout
+            headless = self._headless
 
             task_items = []
             type_summary_parts = []
@@ -739,14 +1091,13 @@ class Api:
         until_time: 时间范围终点
         """
         try:
-            db.connect(reuse_if_open=True)
-            accounts = [r.url for r in Account.select().order_by(Account.created_at)]
+            accounts = self._read_account_urls()
 
             if not accounts:
                 return {'success': False, 'message': '没有可用的账号'}
 
-            collect_timeout = self._settings.get('collectTimeout', 60)
-            headless = self._settings.get('headless', False)
+            collect_timeout = self._collect_timeout
+            headless = self._headless
 
             task_items = [
                 {'url': url, 'category': '', 'max_articles': article_count}
@@ -764,18 +1115,17 @@ class Api:
     # 文章数据库 API
     # ------------------------------------------
 
+    @db_session()
     def get_articles(self, page=1, page_size=20, filter_rewritten=None):
         """分页查询文章列表"""
         try:
-            db.connect(reuse_if_open=True)
             query = Article.select().order_by(Article.publish_time.desc())
             if filter_rewritten is not None:
                 query = query.where(Article.is_rewritten == filter_rewritten)
-            total = query.count()
-            items = list(query.paginate(page, page_size))
+            items, total = _paginate_with_total(query, page, page_size)
             return {
                 'success': True,
-                'articles': [a.to_dict() for a in items],
+                'articles': items,
                 'total': total,
                 'page': page,
                 'page_size': page_size,
@@ -784,10 +1134,10 @@ class Api:
             log.error(f'查询文章失败: {e}')
             return {'success': False, 'message': str(e)}
 
+    @db_session()
     def toggle_rewritten(self, article_id):
         """切换文章的改写标志"""
         try:
-            db.connect(reuse_if_open=True)
             article = Article.get_or_none(Article.id == article_id)
             if not article:
                 return {'success': False, 'message': '文章不存在'}
@@ -799,10 +1149,10 @@ class Api:
             log.error(f'切换改写标志失败: {e}')
             return {'success': False, 'message': str(e)}
 
+    @db_session()
     def delete_article(self, article_id):
         """删除文章"""
         try:
-            db.connect(reuse_if_open=True)
             rows = Article.delete().where(Article.id == article_id).execute()
             if rows:
                 log.info(f'删除文章: id={article_id}')
@@ -812,12 +1162,15 @@ class Api:
             log.error(f'删除文章失败: {e}')
             return {'success': False, 'message': str(e)}
 
+    @db_session()
     def get_article_stats(self):
         """获取文章统计"""
         try:
-            db.connect(reuse_if_open=True)
-            total = Article.select().count()
-            rewritten = Article.select().where(Article.is_rewritten == True).count()
+            # 一次聚合查询同时得到总数和已改写数（is_rewritten 索引可覆盖）
+            total, rewritten = Article.select(
+                fn.COUNT(SQL('*')),
+                fn.COALESCE(fn.SUM(Article.is_rewritten), 0),
+            ).scalar(as_tuple=True)
             pending = total - rewritten
             return {
                 'success': True,
@@ -832,15 +1185,15 @@ class Api:
     # 文章下载 API
     # ------------------------------------------
 
+    @db_session()
     def download_article(self, article_id):
         """下载文章为 docx 文档"""
         try:
-            db.connect(reuse_if_open=True)
             article = Article.get_or_none(Article.id == article_id)
             if not article:
                 return {'success': False, 'message': '文章不存在'}
 
-            save_path = self._settings.get('articleSavePath', '')
+            save_path = self._article_save_path
             if not save_path:
                 return {'success': False, 'message': '请先在设置中配置文章保存路径'}
 
@@ -848,13 +1201,13 @@ class Api:
             if not article_url:
                 return {'success': False, 'message': '文章链接为空'}
 
-            headless = self._settings.get('headless', False)
-            proxy_pool = self._settings.get('proxyPool', '')
+            headless = self._headless
+            proxy_pool = self._proxy_pool
             log.info(f'下载文章: id={article_id}, title={article.title[:30]}')
 
             async def _do_download():
-                downloader = ArticleDownloader()
-                doc_path = await downloader.download(
+                downloader = await self._get_downloader(headless)
+                return await downloader.download_with_count(
                     article_url=article_url,
                     save_dir=save_path,
                     category=article.category,
@@ -862,13 +1215,12 @@ class Api:
                     headless=headless,
                     proxy_pool=proxy_pool,
                 )
-                return doc_path
 
-            doc_path = self._run_async(_do_download())
+            doc_path, char_count = self._run_async(_do_download())
 
             # 更新数据库
             with _write_lock:
-                Article.update(doc_path=doc_path).where(Article.id == article_id).execute()
+                Article.update(doc_path=doc_path, char_count=char_count).where(Article.id == article_id).execute()
 
             log.info(f'文章下载完成: {doc_path}')
             return {'success': True, 'message': '下载完成', 'doc_path': doc_path}
@@ -876,12 +1228,15 @@ class Api:
             log.error(f'文章下载失败: {e}', exc_info=True)
             return {'success': False, 'message': str(e)}
 
+    @db_session()
     def get_download_stats(self):
         """获取下载统计"""
         try:
-            db.connect(reuse_if_open=True)
-            total = Article.select().count()
-            downloaded = Article.select().where(Article.doc_path != '').count()
+            # 一次聚合查询同时得到总数和已下载数（doc_path 索引可覆盖）
+            total, downloaded = Article.select(
+                fn.COUNT(SQL('*')),
+                fn.COALESCE(fn.SUM(Case(None, [(Article.doc_path != '', 1)], 0)), 0),
+            ).scalar(as_tuple=True)
             not_downloaded = total - downloaded
             return {
                 'success': True,
@@ -892,20 +1247,19 @@ class Api:
         except Exception as e:
             return {'success': False, 'message': str(e)}
 
+    @db_session()
     def get_download_articles(self, page=1, page_size=20, filter_downloaded=None):
         """分页查询文章列表（下载页面专用）"""
         try:
-            db.connect(reuse_if_open=True)
             query = Article.select().order_by(Article.publish_time.desc())
             if filter_downloaded is True:
                 query = query.where(Article.doc_path != '')
             elif filter_downloaded is False:
                 query = query.where((Article.doc_path == '') | (Article.doc_path.is_null()))
-            total = query.count()
-            items = list(query.paginate(page, page_size))
+            items, total = _paginate_with_total(query, page, page_size)
             return {
                 'success': True,
-                'articles': [a.to_dict() for a in items],
+                'articles': items,
                 'total': total,
                 'page': page,
                 'page_size': page_size,
@@ -914,26 +1268,32 @@ class Api:
             log.error(f'查询下载文章失败: {e}')
             return {'success': False, 'message': str(e)}
 
+    @db_session()
     def batch_download_articles(self, article_ids):
-        """批量下载文章（逐个下载，返回总结果）"""
+        """批量下载文章（按 downloadConcurrency 并发下载，返回总结果）"""
         try:
             if isinstance(article_ids, str):
                 article_ids = json.loads(article_ids)
 
-            save_path = self._settings.get('articleSavePath', '')
+            save_path = self._article_save_path
             if not save_path:
                 return {'success': False, 'message': '请先在设置中配置文章保存路径'}
 
-            headless = self._settings.get('headless', False)
-            proxy_pool = self._settings.get('proxyPool', '')
-
-            db.connect(reuse_if_open=True)
             results = []
             success_count = 0
             fail_count = 0
 
+            # 一次查出本批所需的文章字段，避免逐条 get_or_none
+            articles = {
+                a.id: a for a in Article.select(
+                    Article.id, Article.url, Article.title, Article.category
+                ).where(Article.id.in_(article_ids))
+            }
+
+            # 先过滤掉不存在/无链接的文章，剩下的并发下载
+            todo = []
             for article_id in article_ids:
-                article = Article.get_or_none(Article.id == article_id)
+                article = articles.get(article_id)
                 if not article:
                     results.append({'id': article_id, 'success': False, 'message': '文章不存在'})
                     fail_count += 1
@@ -944,46 +1304,34 @@ class Api:
                     fail_count += 1
                     continue
 
-                try:
-                    log.info(f'批量下载: id={article_id}, title={article.title[:30]}')
-
-                    # 通知前端进度
-                    if self._window:
-                        try:
-                            self._window.evaluate_js(
-                                f'window.__onDownloadProgress && window.__onDownloadProgress({article_id}, {json.dumps(article.title[:30])}, {success_count + fail_count + 1}, {len(article_ids)})'
-                            )
-                        except Exception:
-                            pass
-
-                    async def _do_download():
-                        downloader = ArticleDownloader()
-                        doc_path = await downloader.download(
-                            article_url=article.url,
-                            save_dir=save_path,
-                            category=article.category,
-                            title=article.title,
-                            headless=headless,
-                            proxy_pool=proxy_pool,
-                        )
-                        return doc_path
-
-                    doc_path = self._run_async(_do_download())
+                todo.append(article)
 
-                    with _write_lock:
-                        Article.update(doc_path=doc_path).where(Article.id == article_id).execute()
+            concurrency = _int_setting(self._settings, 'downloadConcurrency', 4, 1, 16)
+            progress = _ThrottledProgress(self._window, '__onDownloadProgress')
+            try:
+                outcomes, timed_out = self._download_batch(
+                    todo, concurrency, progress, progress_base=fail_count, progress_total=len(article_ids),
+                ) if todo else ({}, False)
+            finally:
+                progress.flush()
 
-                    results.append({'id': article_id, 'success': True, 'doc_path': doc_path})
-                    success_count += 1
-                except Exception as e:
-                    log.error(f'批量下载失败: id={article_id}, err={e}')
-                    results.append({'id': article_id, 'success': False, 'message': str(e)[:100]})
+            for article in todo:
+                outcome = outcomes.get(article.id)
+                if outcome is None:
+                    results.append({'id': article.id, 'success': False, 'message': '下载超时，已取消'})
+                    fail_count += 1
+                elif isinstance(outcome, BaseException):
+                    results.append({'id': article.id, 'success': False, 'message': str(outcome)[:100]})
                     fail_count += 1
+                else:
+                    results.append({'id': article.id, 'success': True, 'doc_path': outcome})
+                    success_count += 1
 
-            log.info(f'批量下载完成: 成功 {success_count}, 失败 {fail_count}')
+            log.info(f'批量下载{"超时" if timed_out else "完成"}: 成功 {success_count}, 失败 {fail_count}')
+            head = '下载超时，未完成的已取消' if timed_out else '下载完成'
             return {
                 'success': True,
-                'message': f'下载完成: 成功 {success_count} 篇, 失败 {fail_count} 篇',
+                'message': f'{head}: 成功 {success_count} 篇, 失败 {fail_count} 篇',
                 'results': results,
                 'success_count': success_count,
                 'fail_count': fail_count,
@@ -996,20 +1344,22 @@ class Api:
     # 文章改写 API
     # ------------------------------------------
 
+    @db_session()
     def rewrite_article(self, article_id):
         """改写单篇文章"""
+        # 整个流程使用同一份设置快照，中途保存设置不会前后不一致
+        settings = self._settings
         try:
             # 检查设置
-            rewrite_path = self._settings.get('rewriteSavePath', '')
+            rewrite_path = settings.get('rewriteSavePath', '')
             if not rewrite_path:
                 return {'success': False, 'message': '请先在设置中配置改写文章保存路径'}
-            api_base = self._settings.get('apiBase', '')
-            api_key = self._settings.get('apiKey', '')
-            model = self._settings.get('model', '')
+            api_base = settings.get('apiBase', '')
+            api_key = settings.get('apiKey', '')
+            model = settings.get('model', '')
             if not api_base or not api_key or not model:
                 return {'success': False, 'message': '请先在设置中配置模型 API 地址、秘钥和模型名称'}
 
-            db.connect(reuse_if_open=True)
             article = Article.get_or_none(Article.id == article_id)
             if not article:
                 return {'success': False, 'message': '文章不存在'}
@@ -1022,8 +1372,8 @@ class Api:
                     Article.delete().where(Article.id == article_id).execute()
                 return {'success': True, 'message': '不支持的域名，已自动删除', 'deleted': True}
 
-            headless = self._settings.get('headless', False)
-            proxy_pool = self._settings.get('proxyPool', '')
+            headless = self._headless
+            proxy_pool = self._proxy_pool
             log.info(f'改写文章: id={article_id}, title={article.title[:30]}')
 
             # 1. 提取文章元素：优先读本地 docx，没有则从网页抓取
@@ -1032,70 +1382,53 @@ class Api:
                 elements = read_docx_elements(article.doc_path)
             else:
                 log.info(f'本地无文件，从网页抓取: {article.url}')
-                async def _fetch():
-                    return await fetch_article_elements(article.url, headless=headless, proxy_pool=proxy_pool)
-                elements = self._run_async(_fetch())
+                elements = self._run_async(self._fetch_elements(article.url, headless, proxy_pool))
 
             # 2. 分离文字段落
-            text_indices = []
-            paragraphs = []
-            for i, elem in enumerate(elements):
-                if elem['type'] == 'text':
-                    text_indices.append(i)
-                    paragraphs.append(elem['text'])
+            text_indices, paragraphs, total_chars = _split_text_elements(elements)
 
             if not paragraphs:
                 return {'success': False, 'message': '文章没有可改写的文字内容'}
 
             # 2.5. 字数不足的文章直接删除
-            total_chars = sum(len(p) for p in paragraphs)
-            max_word_count = self._settings.get('maxWordCount', 1000)
+            max_word_count = settings.get('maxWordCount', 1000)
             if total_chars < max_word_count:
                 # #region agent log
-                _dbg = '/Users/chaiyapeng/Documents/toutiao/.cursor/debug.log'
-                open(_dbg, 'a').write(json.dumps({"location":"api.py:rewrite_article:delete_short","message":"文章字数不足已删除","data":{"article_id":article_id,"title":article.title[:50],"total_chars":total_chars,"reason":f"total_chars < {max_word_count}"},"timestamp":int(time.time()*1000)}) + '\n')
+                if DEBUG_LOG_ENABLED:
+                    debug_log.emit("api.py:rewrite_article:delete_short", "文章字数不足已删除", {"article_id":article_id,"title":article.title[:50],"total_chars":total_chars,"reason":f"total_chars < {max_word_count}"})
                 # #endregion
                 log.info(f'文章字数不足 {max_word_count}（{total_chars} 字），直接删除: id={article_id}, title={article.title[:30]}')
                 with _write_lock:
                     Article.delete().where(Article.id == article_id).execute()
                 return {'success': True, 'message': f'文章字数不足 {max_word_count}（{total_chars} 字），已自动删除', 'deleted': True}
 
-            # 3. 调用 LLM 改写（失败自动重试最多 3 次）
-            timeout = self._settings.get('timeout', 30000) / 1000  # 毫秒转秒
-            client = RewriteClient(api_base, api_key, model, timeout=timeout)
-
-            max_retries = 3
-            last_error = None
-            for attempt in range(1, max_retries + 1):
-                try:
-                    new_title, new_paragraphs = client.rewrite(article.title, paragraphs)
-                    last_error = None
-                    break
-                except SensitiveContentError as e:
-                    # 敏感词等需删文的错误：不重试，直接删文
-                    # #region agent log
-                    _dbg = '/Users/chaiyapeng/Documents/toutiao/.cursor/debug.log'
-                    open(_dbg, 'a').write(json.dumps({"location":"api.py:rewrite_article:delete_sensitive","message":"敏感词已删除","data":{"article_id":article_id,"title":article.title[:50],"reason":str(e)[:200]},"timestamp":int(time.time()*1000)}) + '\n')
-                    # #endregion
-                    log.info(f'内容包含敏感词，删除文章: id={article_id}, title={article.title[:30]}')
-                    with _write_lock:
-                        Article.delete().where(Article.id == article_id).execute()
-                    return {'success': True, 'message': '内容包含敏感词，已自动删除', 'deleted': True}
-                except Exception as e:
-                    last_error = e
-                    if attempt < max_retries:
-                        log.warning(f'改写失败 (第 {attempt}/{max_retries} 次)，5s 后重试: {e}')
-                        time.sleep(5)
-                    else:
-                        log.error(f'改写失败，已重试 {max_retries} 次: {e}')
+            # 3. 调用 LLM 改写（可重试错误按指数退避重试）
+            timeout = settings.get('timeout', 30000) / 1000  # 毫秒转秒
+            client = self._get_rewrite_client(api_base, api_key, model, timeout)
 
-            if last_error is not None:
-                raise last_error
+            # 单篇连同重试最多 perTaskTimeout 秒，0 表示不限
+            task_timeout = settings.get('perTaskTimeout', 300)
+            deadline = time.monotonic() + task_timeout if task_timeout else None
+            try:
+                new_title, new_paragraphs = call_with_backoff(
+                    lambda: client.rewrite(article.title, paragraphs, deadline=deadline),
+                    deadline=deadline,
+                    **self._rewrite_backoff(settings),
+                )
+            except SensitiveContentError as e:
+                # 敏感词等需删文的错误：不重试，直接删文
+                # #region agent log
+                if DEBUG_LOG_ENABLED:
+                    debug_log.emit("api.py:rewrite_article:delete_sensitive", "敏感词已删除", {"article_id":article_id,"title":article.title[:50],"reason":str(e)[:200]})
+                # #endregion
+                log.info(f'内容包含敏感词，删除文章: id={article_id}, title={article.title[:30]}')
+                with _write_lock:
+                    Article.delete().where(Article.id == article_id).execute()
+                return {'success': True, 'message': '内容包含敏感词，已自动删除', 'deleted': True}
 
-            # 4. 替换文字段落（保持图片位置不变）
-            for idx, text_idx in enumerate(text_indices):
-                if idx < len(new_paragraphs):
-                    elements[text_idx] = {'type': 'text', 'text': new_paragraphs[idx]}
+            # 4. 替换文字段落（保持图片位置不变；元素是本次新解析的，原地改写不影响别处）
+            for text_idx, new_text in zip(text_indices, new_paragraphs):
+                elements[text_idx]['text'] = new_text
 
             # 5. 生成 docx 保存
             filename = safe_filename(new_title) + '.docx'
@@ -1116,210 +1449,281 @@ class Api:
 
         except Exception as e:
             # #region agent log
-            _dbg = '/Users/chaiyapeng/Documents/toutiao/.cursor/debug.log'
-            open(_dbg, 'a').write(json.dumps({"location":"api.py:rewrite_article:error","message":"单篇改写失败","data":{"article_id":article_id,"error":str(e)[:200],"error_type":type(e).__name__},"timestamp":int(time.time()*1000)}) + '\n')
+            if DEBUG_LOG_ENABLED:
+                debug_log.emit("api.py:rewrite_article:error", "单篇改写失败", {"article_id":article_id,"error":str(e)[:200],"error_type":type(e).__name__})
             # #endregion
             log.error(f'文章改写失败: {e}', exc_info=True)
             return {'success': False, 'message': str(e)}
 
+    @db_session()
     def batch_rewrite_articles(self, force=False):
         """批量改写文章（多线程并行）"""
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        import threading as _threading
+        from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 
+        # 停止信号最先复位：准备阶段（预删、计数等）点的“停止”也要生效
+        self._rewrite_stop.clear()
+        # 设置在批次开始时读一次，worker 只用局部变量
+        settings = self._settings
         try:
             # 检查设置
-            rewrite_path = self._settings.get('rewriteSavePath', '')
+            rewrite_path = settings.get('rewriteSavePath', '')
             if not rewrite_path:
                 return {'success': False, 'message': '请先在设置中配置改写文章保存路径'}
-            api_base = self._settings.get('apiBase', '')
-            api_key = self._settings.get('apiKey', '')
-            model = self._settings.get('model', '')
+            api_base = settings.get('apiBase', '')
+            api_key = settings.get('apiKey', '')
+            model = settings.get('model', '')
             if not api_base or not api_key or not model:
                 return {'success': False, 'message': '请先在设置中配置模型 API 地址、秘钥和模型名称'}
 
-            db.connect(reuse_if_open=True)
+            # 下载时已统计过字数且不足的文章直接在 SQL 里删掉，不再逐篇读 docx 判断
+            max_word_count = settings.get('maxWordCount', 1000)
+            short_query = Article.delete().where(
+                (Article.url != '') & Article.char_count.between(1, max_word_count - 1)
+            )
+            if not force:
+                short_query = short_query.where(Article.is_rewritten == False)
+            with _write_lock:
+                pre_deleted = short_query.execute()
+            if pre_deleted:
+                log.info(f'字数不足 {max_word_count} 的已下载文章直接删除: {pre_deleted} 篇')
+
             if force:
-                articles = list(Article.select().where(Article.url != '').order_by(Article.publish_time.desc()))
+                query = Article.select().where(Article.url != '')
             else:
-                articles = list(Article.select().where(
-                    (Article.is_rewritten == False) & (Article.url != '')
-                ).order_by(Article.publish_time.desc()))
-
-            if not articles:
-                return {'success': True, 'message': '没有需要改写的文章', 'success_count': 0, 'fail_count': 0}
-
-            headless = self._settings.get('headless', False)
-            proxy_pool = self._settings.get('proxyPool', '')
-            total = len(articles)
-            success_count = 0
-            fail_count = 0
-            deleted_count = 0   # 字数不足被删除
-            skip_count = 0      # 无文字内容被跳过
-            completed_count = 0
-            counter_lock = _threading.Lock()
-
-            REWRITE_WORKERS = self._settings.get('rewriteWorkers', 10)
+                query = Article.select().where((Article.is_rewritten == False) & (Article.url != ''))
+            query = query.order_by(Article.publish_time.desc())
 
+            # 先 COUNT 判断是否有活，文章本身在提交任务时用 iterator() 流式读取，不一次性全部实例化
+            total = query.count()
+            if not total:
+                msg = '没有需要改写的文章'
+                if pre_deleted:
+                    msg += f'（已删除 {pre_deleted} 篇字数不足的文章）'
+                return {'success': True, 'message': msg, 'success_count': 0, 'fail_count': 0, 'deleted_count': pre_deleted}
+
+            headless = self._headless
+            proxy_pool = self._proxy_pool
+
+            # 分类 -> 保存目录，整批只计算并创建一次
+            categories = query.select(Article.category).order_by().distinct().tuples()
+            folder_cache = {
+                c: os.path.join(rewrite_path, safe_filename(c)) if c else rewrite_path
+                for (c,) in categories
+            }
+            for folder in set(folder_cache.values()):
+                os.makedirs(folder, exist_ok=True)
+
+            # 进度序号；next() 在 GIL 下是原子的，worker 之间无需加锁
+            progress_seq = itertools.count(1)
+            progress = _ThrottledProgress(self._window, '__onRewriteProgress', interval=0.2)
+
+            REWRITE_WORKERS = settings.get('rewriteWorkers', 10)
+            backoff = self._rewrite_backoff(settings)
+            # LLM 调用限速：平均每秒 1 次，最多 REWRITE_WORKERS 个突发
+            bucket = TokenBucket(rate=1.0, capacity=REWRITE_WORKERS)
+            # 整批共用一个客户端，各 worker 复用同一个 HTTP 连接池
+            timeout = settings.get('timeout', 30000) / 1000
+            task_timeout = settings.get('perTaskTimeout', 300)
+            run_async = self._run_async
+            # 停止信号同时传给客户端：限流冷却、重试退避中的 worker 能立即放弃，不等满冷却时间
+            client = RewriteClient(api_base, api_key, model, timeout=timeout, pool_size=REWRITE_WORKERS,
+                                   cancel_event=self._rewrite_stop)
+
+            # worker 不查库（改写结果交给 article_committer 写入），不占用连接池：
+            # LLM 调用动辄几十秒，占着连接会让线程数超过连接池上限的 worker 等到超时
             def _rewrite_worker(article):
-                """单篇改写 worker，在线程池线程中执行"""
-                nonlocal success_count, fail_count, deleted_count, skip_count, completed_count
-
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-
+                """
+                单篇改写 worker，在线程池线程中执行
+                返回结果类别：deleted（字数不足、敏感词、域名不支持）/ skipped（无文字）/ cancelled（停止后放弃）/ failed
+                改写成功时返回 docx 线程池中保存任务的 Future，其结果为 success / failed
+                """
                 try:
-                    # 推送进度
-                    with counter_lock:
-                        completed_count += 1
-                        current = completed_count
-                    if self._window:
-                        try:
-                            self._window.evaluate_js(
-                                f'window.__onRewriteProgress && window.__onRewriteProgress({current}, {total}, {json.dumps(article.title[:30])})'
-                            )
-                        except Exception:
-                            pass
+                    # 推送进度（节流，最多每秒 5 次）
+                    current = next(progress_seq)
+                    progress.emit(current, total, article.title[:30])
 
                     log.info(f'批量改写 [{current}/{total}]: {article.title[:30]}')
 
+                    # 本地 docx 是否存在只 stat 一次，后面两处判断共用
+                    has_local_doc = bool(article.doc_path) and os.path.isfile(article.doc_path)
+
                     # 0. 无本地文件且域名不支持 → 直接删除
-                    if not (article.doc_path and os.path.isfile(article.doc_path)) and not is_supported_url(article.url):
+                    if not has_local_doc and not is_supported_url(article.url):
                         log.info(f'不支持的域名，删除文章: id={article.id}, url={article.url[:80]}')
-                        with _write_lock:
-                            db.connect(reuse_if_open=True)
-                            Article.delete().where(Article.id == article.id).execute()
-                        with counter_lock:
-                            deleted_count += 1
-                        return
+                        article_committer.put(('deleted', article.id))
+                        return 'deleted'
 
                     # 1. 提取元素：优先读本地 docx
-                    if article.doc_path and os.path.isfile(article.doc_path):
+                    if has_local_doc:
                         log.info(f'从本地 docx 读取: {article.doc_path}')
                         elements = read_docx_elements(article.doc_path)
                     else:
                         log.info(f'本地无文件，从网页抓取: {article.url}')
-                        elements = loop.run_until_complete(
-                            fetch_article_elements(article.url, headless=headless, proxy_pool=proxy_pool)
-                        )
+                        # 抓取协程交给 API 常驻事件循环执行，共用常驻下载器的浏览器（每篇一个 context），
+                        # worker 线程只等结果，不再各自启动浏览器
+                        elements = run_async(self._fetch_elements(article.url, headless, proxy_pool))
 
                     # 2. 分离文字
-                    text_indices = []
-                    paragraphs = []
-                    for idx, elem in enumerate(elements):
-                        if elem['type'] == 'text':
-                            text_indices.append(idx)
-                            paragraphs.append(elem['text'])
+                    text_indices, paragraphs, total_chars = _split_text_elements(elements)
 
                     if not paragraphs:
                         # #region agent log
-                        _dbg = '/Users/chaiyapeng/Documents/toutiao/.cursor/debug.log'
-                        open(_dbg, 'a').write(json.dumps({"location":"api.py:batch_rewrite:skip_no_content","message":"无文字内容跳过","data":{"article_id":article.id,"title":article.title[:50]},"timestamp":int(time.time()*1000)}) + '\n')
+                        if DEBUG_LOG_ENABLED:
+                            debug_log.emit("api.py:batch_rewrite:skip_no_content", "无文字内容跳过", {"article_id":article.id,"title":article.title[:50]})
                         # #endregion
                         log.warning(f'文章无文字内容，跳过: id={article.id}')
-                        with counter_lock:
-                            skip_count += 1
-                        return
+                        return 'skipped'
 
                     # 2.5. 字数不足的文章直接删除
-                    total_chars = sum(len(p) for p in paragraphs)
-                    max_word_count = self._settings.get('maxWordCount', 1000)
                     if total_chars < max_word_count:
                         # #region agent log
-                        _dbg = '/Users/chaiyapeng/Documents/toutiao/.cursor/debug.log'
-                        open(_dbg, 'a').write(json.dumps({"location":"api.py:batch_rewrite:delete_short","message":"字数不足已删除","data":{"article_id":article.id,"title":article.title[:50],"total_chars":total_chars,"reason":f"total_chars < {max_word_count}"},"timestamp":int(time.time()*1000)}) + '\n')
+                        if DEBUG_LOG_ENABLED:
+                            debug_log.emit("api.py:batch_rewrite:delete_short", "字数不足已删除", {"article_id":article.id,"title":article.title[:50],"total_chars":total_chars,"reason":f"total_chars < {max_word_count}"})
                         # #endregion
                         log.info(f'文章字数不足 {max_word_count}（{total_chars} 字），直接删除: id={article.id}, title={article.title[:30]}')
-                        with _write_lock:
-                            db.connect(reuse_if_open=True)
-                            Article.delete().where(Article.id == article.id).execute()
-                        with counter_lock:
-                            deleted_count += 1
-                        return
-
-                    # 3. LLM 改写（失败自动重试最多 3 次）
-                    timeout = self._settings.get('timeout', 30000) / 1000
-                    client = RewriteClient(api_base, api_key, model, timeout=timeout)
-
-                    max_retries = 3
-                    last_error = None
-                    for attempt in range(1, max_retries + 1):
-                        try:
-                            new_title, new_paragraphs = client.rewrite(article.title, paragraphs)
-                            last_error = None
-                            break
-                        except SensitiveContentError as e:
-                            # 敏感词等需删文的错误：不重试，直接删文
-                            # #region agent log
-                            _dbg = '/Users/chaiyapeng/Documents/toutiao/.cursor/debug.log'
-                            open(_dbg, 'a').write(json.dumps({"location":"api.py:batch_rewrite:delete_sensitive","message":"敏感词已删除","data":{"article_id":article.id,"title":article.title[:50],"reason":str(e)[:200]},"timestamp":int(time.time()*1000)}) + '\n')
-                            # #endregion
-                            log.info(f'内容包含敏感词，删除文章: id={article.id}, title={article.title[:30]}')
-                            with _write_lock:
-                                db.connect(reuse_if_open=True)
-                                Article.delete().where(Article.id == article.id).execute()
-                            with counter_lock:
-                                deleted_count += 1
-                            return
-                        except Exception as e:
-                            last_error = e
-                            if attempt < max_retries:
-                                log.warning(f'改写失败 (第 {attempt}/{max_retries} 次)，5s 后重试: id={article.id}, err={e}')
-                                time.sleep(5)
-                            else:
-                                log.error(f'改写失败，已重试 {max_retries} 次: id={article.id}, err={e}')
-
-                    if last_error is not None:
-                        raise last_error
-
-                    # 4. 替换文字段落（保持图片位置不变）
-                    for j, text_idx in enumerate(text_indices):
-                        if j < len(new_paragraphs):
-                            elements[text_idx] = {'type': 'text', 'text': new_paragraphs[j]}
-
-                    # 5. 保存 docx
-                    filename = safe_filename(new_title) + '.docx'
-                    if article.category:
-                        folder = os.path.join(rewrite_path, safe_filename(article.category))
-                    else:
-                        folder = rewrite_path
-                    save_path = os.path.join(folder, filename)
-
-                    generate_docx(elements, save_path, source_url=article.url)
+                        article_committer.put(('deleted', article.id))
+                        return 'deleted'
 
-                    # 6. 更新数据库
-                    with _write_lock:
-                        db.connect(reuse_if_open=True)
-                        Article.update(is_rewritten=True).where(Article.id == article.id).execute()
+                    # 3. LLM 改写（可重试错误按指数退避重试）
+                    # 单篇连同重试最多占用 worker perTaskTimeout 秒，卡住的请求不会一直霸占线程
+                    bucket.acquire()
+                    deadline = time.monotonic() + task_timeout if task_timeout else None
+                    try:
+                        new_title, new_paragraphs = call_with_backoff(
+                            lambda: client.rewrite(article.title, paragraphs, deadline=deadline),
+                            label=f': id={article.id}',
+                            deadline=deadline,
+                            cancel=self._rewrite_stop,
+                            **backoff,
+                        )
+                    except SensitiveContentError as e:
+                        # 敏感词等需删文的错误：不重试，直接删文
+                        # #region agent log
+                        if DEBUG_LOG_ENABLED:
+                            debug_log.emit("api.py:batch_rewrite:delete_sensitive", "敏感词已删除", {"article_id":article.id,"title":article.title[:50],"reason":str(e)[:200]})
+                        # #endregion
+                        log.info(f'内容包含敏感词，删除文章: id={article.id}, title={article.title[:30]}')
+                        article_committer.put(('deleted', article.id))
+                        return 'deleted'
 
-                    with counter_lock:
-                        success_count += 1
+                    # 4. 替换文字段落（保持图片位置不变；元素是本次新解析的，原地改写不影响别处）
+                    for text_idx, new_text in zip(text_indices, new_paragraphs):
+                        elements[text_idx]['text'] = new_text
 
-                    log.info(f'改写完成: {save_path}')
+                    # 5. 保存 docx 交给 docx 线程池，LLM 线程立即去处理下一篇
+                    filename = safe_filename(new_title) + '.docx'
+                    save_path = os.path.join(folder_cache[article.category], filename)
+                    return docx_pool.submit(_save_worker, article, elements, save_path)
 
+                except RewriteCancelled:
+                    log.info(f'批量改写已停止，放弃: id={article.id}')
+                    return 'cancelled'
                 except Exception as e:
                     # #region agent log
-                    _dbg = '/Users/chaiyapeng/Documents/toutiao/.cursor/debug.log'
-                    open(_dbg, 'a').write(json.dumps({"location":"api.py:batch_rewrite:error","message":"批量改写失败(需关注是否应删文)","data":{"article_id":article.id,"title":article.title[:50],"error":str(e)[:200],"error_type":type(e).__name__},"timestamp":int(time.time()*1000)}) + '\n')
+                    if DEBUG_LOG_ENABLED:
+                        debug_log.emit("api.py:batch_rewrite:error", "批量改写失败(需关注是否应删文)", {"article_id":article.id,"title":article.title[:50],"error":str(e)[:200],"error_type":type(e).__name__})
                     # #endregion
                     log.error(f'批量改写失败: id={article.id}, err={e}', exc_info=True)
-                    with counter_lock:
-                        fail_count += 1
-                finally:
-                    loop.close()
+                    return 'failed'
 
-            log.info(f'批量改写启动: {total} 篇文章, {REWRITE_WORKERS} 线程')
+            def _save_worker(article, elements, save_path):
+                """生成改写后的 docx（下载图片、压缩、写盘），在 docx 线程池中执行"""
+                try:
+                    generate_docx(elements, save_path, source_url=article.url, ensure_dir=False)
+                    # 更新数据库（由后台线程合并提交）
+                    article_committer.put(('rewritten', article.id))
+                    log.info(f'改写完成: {save_path}')
+                    return 'success'
+                except Exception as e:
+                    log.error(f'保存改写文档失败: id={article.id}, err={e}', exc_info=True)
+                    return 'failed'
 
-            with ThreadPoolExecutor(max_workers=REWRITE_WORKERS, thread_name_prefix='rewriter') as executor:
-                futures = []
-                for art in articles:
-                    futures.append(executor.submit(_rewrite_worker, art))
-                    time.sleep(1)  # 每秒提交一个任务，避免瞬间并发过高
-                for f in as_completed(futures):
+            log.info(f'批量改写启动: {total} 篇文章, {REWRITE_WORKERS} 线程')
+            if self._rewrite_stop.is_set():
+                # 提交循环会直接退出，整批按“已停止”汇总
+                log.info('批量改写启动前已收到停止信号，不提交任务')
+
+            # 改写成功的标记和需删除的文章攒批写入，减少写锁争用和提交次数
+            article_committer = BatchCommitter(apply_article_changes)
+            commit_failed = []
+            # 各 worker 只返回结果类别，由当前线程汇总计数
+            outcomes = Counter()
+
+            # 已交给 docx 线程池、尚未保存完的任务
+            saving = set()
+
+            # 快速失败：一篇都没改写成功就连续失败 FAIL_FAST_LIMIT 篇，多半是秘钥/模型配置有误，
+            # 继续跑只会白白消耗时间和配额，直接中止整批
+            FAIL_FAST_LIMIT = 5
+            consecutive_fails = 0
+            any_rewritten = False
+            aborted = False
+
+            def _collect(done):
+                nonlocal consecutive_fails, any_rewritten, aborted
+                for f in done:
                     try:
-                        f.result(timeout=600)
-                    except Exception:
-                        pass
+                        result = f.result()
+                    except Exception as e:
+                        log.error(f'批量改写任务异常: {e}', exc_info=True)
+                        result = 'failed'
+                    if isinstance(result, Future):
+                        saving.add(result)
+                        any_rewritten = True
+                        consecutive_fails = 0
+                        continue
+                    outcomes[result] += 1
+                    if result != 'failed':
+                        consecutive_fails = 0
+                        continue
+                    consecutive_fails += 1
+                    if not any_rewritten and consecutive_fails >= FAIL_FAST_LIMIT and not aborted:
+                        aborted = True
+                        log.error(f'批量改写连续失败 {consecutive_fails} 篇且无一成功，中止剩余任务')
+                        # 复用停止信号：不再提交新任务，未开始的任务取消
+                        self._rewrite_stop.set()
+
+            # 在途任务最多 REWRITE_WORKERS * 2 个，满了先等一个完成再提交，不一次性创建全部 future
+            max_pending = REWRITE_WORKERS * 2
+            # LLM 调用是纯网络等待，docx 生成占 CPU 和磁盘，分两个线程池各自按合适的并发跑
+            docx_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix='docx')
+            try:
+                with ThreadPoolExecutor(max_workers=REWRITE_WORKERS, thread_name_prefix='rewriter') as executor:
+                    pending = set()
+                    articles_iter = query.iterator()
+                    while True:
+                        # 补满在途任务；收到停止信号后不再提交
+                        while len(pending) < max_pending and not self._rewrite_stop.is_set():
+                            art = next(articles_iter, None)
+                            if art is None:
+                                break
+                            pending.add(executor.submit(_rewrite_worker, art))
+                        if not pending:
+                            break
+                        # 定时醒来检查停止信号，不被单个卡住的任务拖住
+                        done, pending = wait(pending, timeout=30, return_when=FIRST_COMPLETED)
+                        _collect(done)
+                        if self._rewrite_stop.is_set():
+                            # 还没开始的任务直接取消，正在执行的等它结束
+                            pending = {f for f in pending if not f.cancel()}
+                done, _ = wait(saving)
+                _collect(done)
+            finally:
+                docx_pool.shutdown(wait=True)
+                client.close()
+                commit_failed = article_committer.close()
+                progress.flush()
+            # 状态没能写进数据库的文章不算成功：下次仍会被选中，计入失败
+            for kind, _ in commit_failed:
+                outcomes['success' if kind == 'rewritten' else 'deleted'] -= 1
+                outcomes['failed'] += 1
+            if commit_failed:
+                log.error(f'批量改写: {len(commit_failed)} 篇文章的状态写入数据库失败，计为失败')
+            success_count = outcomes['success']
+            fail_count = outcomes['failed']
+            deleted_count = outcomes['deleted'] + pre_deleted   # 字数不足、敏感词或域名不支持被删除
+            skip_count = outcomes['skipped']      # 无文字内容被跳过
+            stopped = self._rewrite_stop.is_set() and not aborted
 
             # 构建结果消息
             parts = [f'改写成功 {success_count} 篇']
@@ -1329,9 +1733,15 @@ class Api:
                 parts.append(f'无内容跳过 {skip_count} 篇')
             if fail_count > 0:
                 parts.append(f'失败 {fail_count} 篇')
-            msg = '改写完成: ' + ', '.join(parts)
+            if aborted:
+                head = f'改写已中止（连续 {FAIL_FAST_LIMIT} 篇失败，请检查模型配置）: '
+            elif stopped:
+                head = '改写已停止: '
+            else:
+                head = '改写完成: '
+            msg = head + ', '.join(parts)
 
-            log.info(f'批量改写完成: 成功={success_count}, 删除={deleted_count}, 跳过={skip_count}, 失败={fail_count}')
+            log.info(f'批量改写{"已中止" if aborted else "已停止" if stopped else "完成"}: 成功={success_count}, 删除={deleted_count}, 跳过={skip_count}, 失败={fail_count}')
             return {
                 'success': True,
                 'message': msg,
@@ -1339,121 +1749,126 @@ class Api:
                 'fail_count': fail_count,
                 'deleted_count': deleted_count,
                 'skip_count': skip_count,
+                'stopped': stopped,
+                'aborted': aborted,
             }
         except Exception as e:
             log.error(f'批量改写失败: {e}', exc_info=True)
             return {'success': False, 'message': str(e)}
 
+    def stop_batch_rewrite(self):
+        """停止批量改写：未开始的文章不再处理，正在改写的完成后结束"""
+        self._rewrite_stop.set()
+        log.info('批量改写停止信号已发送')
+        return {'success': True, 'message': '已发送停止信号'}
+
+    @db_session()
     def import_article_urls(self, urls_text):
         """通过文章链接批量导入文章（一行一个链接）"""
-        import re
         from datetime import datetime
 
         try:
             if isinstance(urls_text, str):
-                raw_urls = [l.strip() for l in urls_text.strip().splitlines() if l.strip()]
+                # 每行只 strip 一次，空行直接丢掉
+                raw_urls = [l for l in map(str.strip, urls_text.splitlines()) if l]
             else:
                 raw_urls = []
 
             if not raw_urls:
                 return {'success': False, 'message': '请输入至少一个文章链接'}
 
-            db.connect(reuse_if_open=True)
-
             added = 0
             skipped = 0
             invalid = 0
             now = datetime.now()
+            new_rows = []
+            seen_ids = set()
+            seen_urls = set()
+
+            def _queue(group_id, title, url):
+                """登记待插入的文章，本批内已出现过的返回 False"""
+                if group_id in seen_ids or url in seen_urls:
+                    return False
+                seen_ids.add(group_id)
+                seen_urls.add(url)
+                new_rows.append({
+                    'group_id': group_id,
+                    'title': title,
+                    'url': url,
+                    'created_at': now,
+                    'updated_at': now,
+                })
+                return True
+
+            # 先解析全部链接，再一次性查库去重，不再每个链接单独查询
+            # 每项为 (group_id, title, url, 是否按 group_id 查重, 需按 url 查重的链接)
+            candidates = []
+            for url in raw_urls:
+                if _is_huiwen_url(url):
+                    # 统一协议为 https，避免 http/https 重复导入
+                    if url.startswith('http://'):
+                        url = 'https://' + url[len('http://'):]
+                    if not url.startswith('http'):
+                        url = 'https://' + url.lstrip('/')
+                    # 去掉尾部查询参数后作为去重依据
+                    canonical = url.split('?')[0].rstrip('/')
+                    group_id = _NON_WORD_RE.sub('_', canonical[-60:])
+                    # 也检查 http 版本是否已存在
+                    http_url = url.replace('https://', 'http://', 1)
+                    candidates.append((group_id, f'待下载文章 (huiwen)', url, False, (url, http_url)))
+                    continue
 
-            with _write_lock, db.atomic():
-                for url in raw_urls:
-                    if _is_huiwen_url(url):
-                        # 统一协议为 https，避免 http/https 重复导入
-                        url = re.sub(r'^http://', 'https://', url)
-                        if not url.startswith('http'):
-                            url = 'https://' + url.lstrip('/')
-                        # 去掉尾部查询参数后作为去重依据
-                        canonical = url.split('?')[0].rstrip('/')
-                        group_id = re.sub(r'[^\w]', '_', canonical[-60:])
-                        existing = Article.get_or_none(Article.url == url)
-                        if not existing:
-                            # 也检查 http 版本是否已存在
-                            http_url = url.replace('https://', 'http://', 1)
-                            existing = Article.get_or_none(Article.url == http_url)
-                        if existing:
-                            skipped += 1
-                            continue
-                        Article.create(
-                            group_id=group_id,
-                            title=f'待下载文章 (huiwen)',
-                            url=url,
-                            created_at=now,
-                            updated_at=now,
-                        )
-                        added += 1
-                        continue
+                if _is_people_url(url):
+                    if not url.startswith('http'):
+                        url = 'http://' + url.lstrip('/')
+                    canonical = url.split('?')[0].rstrip('/')
+                    # 从 URL 提取 JSON ID，如 /n/xxx 中的 xxx
+                    people_match = _PEOPLE_ID_RE.search(url)
+                    group_id = people_match.group(1) if people_match else _NON_WORD_RE.sub('_', canonical[-60:])
+                    # 也按 URL 查重（兼容 http/https）
+                    alt_url = url.replace('http://', 'https://', 1) if url.startswith('http://') else url.replace('https://', 'http://', 1)
+                    candidates.append((group_id, f'待下载文章 (people)', url, True, (url, alt_url)))
+                    continue
 
-                    if _is_people_url(url):
-                        if not url.startswith('http'):
-                            url = 'http://' + url.lstrip('/')
-                        canonical = url.split('?')[0].rstrip('/')
-                        # 从 URL 提取 JSON ID，如 /n/xxx 中的 xxx
-                        people_match = re.search(r'/n/(\w+)', url)
-                        group_id = people_match.group(1) if people_match else re.sub(r'[^\w]', '_', canonical[-60:])
-                        existing = Article.get_or_none(Article.group_id == group_id)
-                        if not existing:
-                            # 也按 URL 查重（兼容 http/https）
-                            existing = Article.get_or_none(Article.url == url)
-                            if not existing:
-                                alt_url = url.replace('http://', 'https://', 1) if url.startswith('http://') else url.replace('https://', 'http://', 1)
-                                existing = Article.get_or_none(Article.url == alt_url)
-                        if existing:
-                            skipped += 1
-                            continue
-                        Article.create(
-                            group_id=group_id,
-                            title=f'待下载文章 (people)',
-                            url=url,
-                            created_at=now,
-                            updated_at=now,
-                        )
-                        added += 1
-                        continue
+                # 头条文章 URL 格式
+                # https://www.toutiao.com/article/7473002025927541286/
+                # https://www.toutiao.com/a7473002025927541286/
+                # https://www.toutiao.com/i7473002025927541286/
+                match = _URL_ID_RE.search(url)
+                if not match:
+                    invalid += 1
+                    continue
 
-                    # 头条文章 URL 格式
-                    # https://www.toutiao.com/article/7473002025927541286/
-                    # https://www.toutiao.com/a7473002025927541286/
-                    # https://www.toutiao.com/i7473002025927541286/
-                    match = re.search(r'/article/(\d+)', url)
-                    if not match:
-                        match = re.search(r'/[ai](\d{10,})', url)
-                    if not match:
-                        match = re.search(r'(\d{15,})', url)
-
-                    if not match:
-                        invalid += 1
-                        continue
+                group_id = match.group(match.lastindex)
+
+                # 规范化 URL
+                if not url.startswith('http'):
+                    url = 'https://www.toutiao.com/article/' + group_id + '/'
+
+                candidates.append((group_id, f'待下载文章 ({group_id})', url, True, ()))
 
-                    group_id = match.group(1)
+            check_ids = list({c[0] for c in candidates if c[3]})
+            check_urls = list({u for c in candidates for u in c[4]})
 
-                    # 检查是否已存在
-                    existing = Article.get_or_none(Article.group_id == group_id)
-                    if existing:
+            with _write_lock, db.atomic():
+                existing_ids = set()
+                existing_urls = set()
+                # IN 列表每批 900 个，避开 SQLite 999 个变量的上限
+                for batch in chunked(check_ids, 900):
+                    existing_ids.update(gid for (gid,) in Article.select(Article.group_id).where(Article.group_id.in_(batch)).tuples())
+                for batch in chunked(check_urls, 900):
+                    existing_urls.update(u for (u,) in Article.select(Article.url).where(Article.url.in_(batch)).tuples())
+
+                for group_id, title, url, by_id, urls in candidates:
+                    exists = (by_id and group_id in existing_ids) or any(u in existing_urls for u in urls)
+                    if exists or not _queue(group_id, title, url):
                         skipped += 1
-                        continue
 
-                    # 规范化 URL
-                    if not url.startswith('http'):
-                        url = 'https://www.toutiao.com/article/' + group_id + '/'
-
-                    Article.create(
-                        group_id=group_id,
-                        title=f'待下载文章 ({group_id})',
-                        url=url,
-                        created_at=now,
-                        updated_at=now,
-                    )
-                    added += 1
+                # 分批 insert_many：每行 24 个绑定参数，40 行一批避开旧版 SQLite 999 个变量的上限
+                # 与库中已有行冲突的（如 group_id 撞车）忽略，按实际插入行数计数
+                for batch in chunked(new_rows, 40):
+                    added += Article.insert_many(batch).on_conflict_ignore().as_rowcount().execute()
+                skipped += len(new_rows) - added
 
             parts = []
             if added:
@@ -1476,102 +1891,39 @@ class Api:
             log.error(f'导入文章失败: {e}', exc_info=True)
             return {'success': False, 'message': str(e)}
 
+    @db_session()
     def download_all_articles(self):
-        """下载全部未下载的文章（10线程并发）"""
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        import threading as _threading
-
+        """下载全部未下载的文章（10 篇并发，共用常驻下载器的浏览器）"""
         try:
-            save_path = self._settings.get('articleSavePath', '')
-            if not save_path:
+            if not self._article_save_path:
                 return {'success': False, 'message': '请先在设置中配置文章保存路径'}
 
-            headless = self._settings.get('headless', False)
-            proxy_pool = self._settings.get('proxyPool', '')
-
-            db.connect(reuse_if_open=True)
-            articles = list(Article.select().where(
+            articles = list(Article.select(
+                Article.id, Article.url, Article.title, Article.category
+            ).where(
                 (Article.url != '') & ((Article.doc_path == '') | (Article.doc_path.is_null()))
             ))
 
             if not articles:
                 return {'success': True, 'message': '没有需要下载的文章', 'success_count': 0, 'fail_count': 0}
 
-            total = len(articles)
-            success_count = 0
-            fail_count = 0
-            completed_count = 0
-            counter_lock = _threading.Lock()
-
-            DOWNLOAD_WORKERS = 10
-
-            def _download_worker(article):
-                """单篇下载 worker"""
-                nonlocal success_count, fail_count, completed_count
-
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-
-                try:
-                    with counter_lock:
-                        completed_count += 1
-                        current = completed_count
-
-                    # 通知前端进度
-                    if self._window:
-                        try:
-                            self._window.evaluate_js(
-                                f'window.__onDownloadProgress && window.__onDownloadProgress({article.id}, {json.dumps(article.title[:30])}, {current}, {total})'
-                            )
-                        except Exception:
-                            pass
-
-                    log.info(f'并发下载 [{current}/{total}]: {article.title[:30]}')
-
-                    async def _do_download():
-                        downloader = ArticleDownloader()
-                        doc_path = await downloader.download(
-                            article_url=article.url,
-                            save_dir=save_path,
-                            category=article.category,
-                            title=article.title,
-                            headless=headless,
-                            proxy_pool=proxy_pool,
-                        )
-                        return doc_path
-
-                    doc_path = loop.run_until_complete(_do_download())
-
-                    with _write_lock:
-                        db.connect(reuse_if_open=True)
-                        Article.update(doc_path=doc_path).where(Article.id == article.id).execute()
-
-                    with counter_lock:
-                        success_count += 1
-
-                    log.info(f'下载完成: {doc_path}')
-
-                except Exception as e:
-                    log.error(f'并发下载失败: id={article.id}, err={e}')
-                    with counter_lock:
-                        fail_count += 1
-                finally:
-                    loop.close()
-
-            log.info(f'全部下载启动: {total} 篇文章, {DOWNLOAD_WORKERS} 线程')
+            DOWNLOAD_CONCURRENCY = 10
+            log.info(f'全部下载启动: {len(articles)} 篇文章, 并发 {DOWNLOAD_CONCURRENCY}')
+            progress = _ThrottledProgress(self._window, '__onDownloadProgress')
+            try:
+                outcomes, timed_out = self._download_batch(articles, DOWNLOAD_CONCURRENCY, progress)
+            finally:
+                progress.flush()
 
-            with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS, thread_name_prefix='downloader') as executor:
-                futures = [executor.submit(_download_worker, art) for art in articles]
-                for f in as_completed(futures):
-                    try:
-                        f.result(timeout=300)
-                    except Exception:
-                        pass
+            # 成功数按已写入数据库的结果统计（写库失败的在 outcomes 中记为异常），超时取消的计入失败
+            success_count = sum(1 for v in outcomes.values() if isinstance(v, str))
+            fail_count = len(articles) - success_count
 
-            log.info(f'全部下载完成: 成功 {success_count}, 失败 {fail_count}')
+            log.info(f'全部下载{"超时" if timed_out else "完成"}: 成功 {success_count}, 失败 {fail_count}')
+            head = '下载超时，未完成的已取消' if timed_out else '下载完成'
             return {
                 'success': True,
-                'message': f'下载完成: 成功 {success_count} 篇, 失败 {fail_count} 篇',
+                'message': f'{head}: 成功 {success_count} 篇, 失败 {fail_count} 篇',
                 'success_count': success_count,
                 'fail_count': fail_count,
             }
@@ -1579,10 +1931,10 @@ class Api:
             log.error(f'下载全部文章失败: {e}', exc_info=True)
             return {'success': False, 'message': str(e)}
 
+    @db_session()
     def delete_all_articles(self):
         """删除全部文章"""
         try:
-            db.connect(reuse_if_open=True)
             with _write_lock:
                 count = Article.delete().execute()
             log.info(f'删除全部文章: {count} 篇')
@@ -1606,5 +1958,19 @@ class Api:
             self._run_async(self._toutiao_client.close())
         except Exception:
             pass
+        if self._downloader is not None:
+            try:
+                self._run_async(self._downloader.close())
+            except Exception:
+                pass
+        if self._rewrite_client is not None:
+            self._rewrite_client.close()
         self._loop.call_soon_threadsafe(self._loop.stop)
+        # 关闭连接池中所有空闲连接，退出前落盘 WAL
+        try:
+            db.close_all()
+        except Exception:
+            pass
+        # main 以 os._exit 结束进程，atexit 不会执行，调试日志要在这里写完
+        debug_log.flush()
         log.info('资源清理完成')
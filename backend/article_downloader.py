@@ -7,11 +7,15 @@ import os
 import re
 import io
 import asyncio
+import functools
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from html.parser import HTMLParser
+from requests.adapters import HTTPAdapter
+from lxml import etree
 from datetime import datetime
-from PIL import Image
+from PIL import Image, JpegImagePlugin
 from playwright.async_api import async_playwright
 from docx import Document
 from docx.shared import Inches, Pt
@@ -23,40 +27,159 @@ from runtime_paths import configure_playwright_env
 log = get_logger('downloader')
 
 
+# 文件名中不允许的字符，str.translate 一次扫描全部删除
+_UNSAFE_FILENAME_TABLE = str.maketrans('', '', '\\/:*?"<>|\n\r\t')
+
+
 def safe_filename(name, max_len=80):
     """将标题转为安全的文件名"""
     # 去除不安全字符
-    name = re.sub(r'[\\/:*?"<>|\n\r\t]', '', name)
+    name = name.translate(_UNSAFE_FILENAME_TABLE)
     name = name.strip('. ')
     if len(name) > max_len:
         name = name[:max_len]
     return name or 'untitled'
 
 
-# 署名行匹配模式：如 "文| 杨磊"、"编辑丨姜召"、"责编：张三"、"来源：xxx" 等
+# 署名行关键词：如 "文| 杨磊"、"编辑丨姜召"、"责编：张三"、"来源：xxx" 等
+_SIGNATURE_KEYWORDS = (
+    '文', '作者', '编辑', '责编', '责任编辑', '审核', '初审', '终审', '复审', '校对',
+    '排版', '图片', '来源', '供稿', '记者', '通讯员', '本文作者', '撰文', '策划', '监制', '出品',
+)
+
+# 署名行匹配模式
 _SIGNATURE_PATTERN = re.compile(
-    r'^[\s]*(文|作者|编辑|责编|责任编辑|审核|初审|终审|复审|校对|排版|图片|来源|供稿|记者|通讯员|本文作者|撰文|策划|监制|出品)'
+    r'^[\s]*(' + '|'.join(_SIGNATURE_KEYWORDS) + r')'
     r'[\s]*[|丨/／:：]'
 )
 
+# 署名行可能的首字符，先做廉价的 startswith 过滤，绝大多数正文段落无需进入正则
+_SIGNATURE_PREFIXES = tuple(sorted({k[0] for k in _SIGNATURE_KEYWORDS}))
+
+
+# 声明类提示文字的开头，tuple 直接传给 startswith 一次判断
+_DISCLAIMER_PREFIXES = ('声明：', '声明:')
+
+# 图片插入失败时写进 docx 的占位段落；读回时还原成图片位，不算正文字数
+_IMAGE_FAILED_TEXT = '[图片加载失败]'
+
+# 解析 HTML 时整体跳过的标签
+_SKIP_TAGS = frozenset(('script', 'style', 'noscript'))
+
+# XML 不兼容的控制字符（保留 tab、换行、回车）
+_CTRL_RE = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]')
+
+
+# 预先绑定的方法，逐段调用时少一次属性查找
+_signature_match = _SIGNATURE_PATTERN.match
+_ctrl_sub = _CTRL_RE.sub
+
 
-class ArticleContentParser(HTMLParser):
+def _is_signature_line(text):
+    """判断是否为署名行（text 需已 strip）"""
+    return text.startswith(_SIGNATURE_PREFIXES) and _signature_match(text) is not None
+
+
+# libxml2 建树时会改写结构：遇到块级元素自动闭合 <p>（<p>a<div>b</div>c</p> 被拆成多段）、
+# 丢弃多余的结束标签、把错位的嵌套挪走，html.parser 则原样逐个给出标签。
+# 解析前把每个开始 / 结束标签换成空的标记元素，树是平的、不再改写，
+# 遍历时按标记还原回调，事件序列与 html.parser 一致；
+# script / style 的内容是原始文本，注释里可能有未配对的引号，这两种原样保留；
+# 不构成标签的 '<'（如 "1 < 2"）html.parser 单独作为一段文字回调，也换成标记还原。
+# 已知差异：控制字符在解析前删除，标签内部夹着 NUL 等控制字符时（如 "<x\x00y>"）
+# html.parser 会把它当成文字，这里则当成标签；浏览器序列化出的 innerHTML 不会出现这种写法
+_TAG_TOKEN_RE = re.compile(
+    r'''<(?:!--.*?-->|(script|style)\b.*?</\1\s*>|(/?)([a-zA-Z][^\t\n\r\f />\x00]*)((?:[^>"']|"[^"]*"|'[^']*')*)>|(?![a-zA-Z/!?]))''',
+    re.I | re.S,
+)
+_START_MARK = 'x-s-'
+_END_MARK = 'x-e-'
+_LT_MARK = 'x-lt'
+_LT_ELEMENT = '<%s></%s>' % (_LT_MARK, _LT_MARK)
+# html.parser 的标签名可以含引号、'<' 等字符，这类标签不会是回调里关心的标签，换成合法的名字即可
+_ODD_NAME_RE = re.compile(r'[^a-z0-9-]')
+
+
+def _mark_tag(m):
+    name = m.group(3)
+    if name is None:
+        token = m.group(0)
+        if token != '<':
+            return token
+        # 输入末尾的 '<' 被 html.parser 当作未完的标签留在缓冲里，不回调
+        return '' if m.end() == len(m.string) else _LT_ELEMENT
+    name = _ODD_NAME_RE.sub('-', name.lower())
+    if m.group(2):
+        return '<%s%s></%s%s>' % (_END_MARK, name, _END_MARK, name)
+    attrs = m.group(4)
+    if '<' in attrs:
+        # 属性里裸露的 '<' 会让 libxml2 提前结束标记元素，转义后取到的属性值不变
+        attrs = attrs.replace('<', '&lt;')
+    if attrs.endswith('/'):
+        # <br/> 之类自闭合标签，html.parser 依次回调开始和结束；
+        # 属性原样保留（<img src=/a/b.jpg/> 的值带末尾斜杠，与 html.parser 一致）
+        return '<%s%s%s></%s%s><%s%s></%s%s>' % (
+            _START_MARK, name, attrs, _START_MARK, name, _END_MARK, name, _END_MARK, name)
+    return '<%s%s%s></%s%s>' % (_START_MARK, name, attrs, _START_MARK, name)
+
+
+_mark_tags = functools.partial(_TAG_TOKEN_RE.sub, _mark_tag)
+
+
+class _TreeContentParser:
+    """
+    正文解析基类：标签换成标记后交给 lxml（libxml2，C 实现）一次解析，再按文档顺序遍历，
+    向子类回调 handle_starttag / handle_data / handle_endtag，回调语义与 html.parser 一致
+    """
+
+    def __init__(self):
+        self.elements = []  # [{'type': 'text', 'text': ...}, {'type': 'image', 'url': ...}]
+        self._text_buf = []  # 待合并的文字片段，flush 时一次 join
+
+    def feed(self, html):
+        if not html or not html.strip():
+            return
+        # 控制字符先删掉：libxml2 会把 NUL 等替换成 U+FFFD 留在文字里，之后的 _CTRL_RE 就删不掉了
+        html = _ctrl_sub('', html)
+        # 标签都已换成标记，不需要 lxml.html 的元素类，直接用 etree；parser 不能跨线程共用，每次新建
+        root = etree.fromstring('<div>%s</div>' % _mark_tags(html), etree.HTMLParser())
+        root = root.find('body/div') if root is not None else None
+        if root is None:
+            return
+        handle_starttag = self.handle_starttag
+        handle_endtag = self.handle_endtag
+        handle_data = self.handle_data
+        if root.text:
+            handle_data(root.text)
+        for el in root:
+            tag = el.tag
+            # 注释、处理指令的 tag 不是字符串，只保留其后的文字
+            if isinstance(tag, str):
+                if tag.startswith(_START_MARK):
+                    handle_starttag(tag[4:], el.attrib)
+                elif tag.startswith(_END_MARK):
+                    handle_endtag(tag[4:])
+                elif tag == _LT_MARK:
+                    handle_data('<')
+                else:
+                    # 原样保留的 script / style，内容不回调
+                    handle_starttag(tag, el.attrib)
+                    handle_endtag(tag)
+            if el.tail:
+                handle_data(el.tail)
+
+
+class ArticleContentParser(_TreeContentParser):
     """解析 article-content HTML，提取正文段落和图片（跳过标题和元信息）"""
 
     def __init__(self):
         super().__init__()
-        self.elements = []  # [{'type': 'text', 'text': ...}, {'type': 'image', 'url': ...}]
         self._current_tag = None
-        self._in_article = False
-        self._text_buf = ''
-        self._skip_tags = {'script', 'style', 'noscript'}
         self._skip_depth = 0
         self._skip_block_depth = 0  # 跳过 h1 / article-meta 等块级元素
 
     def handle_starttag(self, tag, attrs):
-        attrs_dict = dict(attrs)
-
-        if tag in self._skip_tags:
+        if tag in _SKIP_TAGS:
             self._skip_depth += 1
             return
 
@@ -67,7 +190,7 @@ class ArticleContentParser(HTMLParser):
             return
 
         # 跳过 <div class="article-meta"> 元信息
-        if tag == 'div' and 'article-meta' in attrs_dict.get('class', ''):
+        if tag == 'div' and 'article-meta' in attrs.get('class', ''):
             self._flush_text()
             self._skip_block_depth += 1
             return
@@ -85,13 +208,13 @@ class ArticleContentParser(HTMLParser):
         elif tag == 'img':
             self._flush_text()
             # 优先 data-src，fallback src
-            url = attrs_dict.get('data-src', '') or attrs_dict.get('src', '')
+            url = attrs.get('data-src', '') or attrs.get('src', '')
             # 过滤 base64 占位图
             if url and not url.startswith('data:'):
                 self.elements.append({'type': 'image', 'url': url})
 
     def handle_endtag(self, tag):
-        if tag in self._skip_tags and self._skip_depth > 0:
+        if tag in _SKIP_TAGS and self._skip_depth > 0:
             self._skip_depth -= 1
             return
 
@@ -110,24 +233,25 @@ class ArticleContentParser(HTMLParser):
             return
         text = data.strip()
         if text:
-            self._text_buf += text
+            self._text_buf.append(text)
 
     def _flush_text(self):
-        text = self._text_buf.strip()
-        self._text_buf = ''
-        if not text:
+        if not self._text_buf:
             return
+        # 片段在 handle_data 中已 strip 且非空，拼接后无需再 strip
+        text = ''.join(self._text_buf)
+        self._text_buf.clear()
         # 清理 XML 不兼容的控制字符
-        text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
+        text = _ctrl_sub('', text)
         if not text:
             return
         # 过滤署名行
-        if _SIGNATURE_PATTERN.match(text):
+        if _is_signature_line(text):
             return
         self.elements.append({'type': 'text', 'text': text})
 
 
-class HuiwenContentParser(HTMLParser):
+class HuiwenContentParser(_TreeContentParser):
     """
     解析 feed.huiwen.co 文章 HTML（.yl-content 结构）
     正文在 <section> > <span> 中，图片在 <div class="yl-img-wrapper"> > <img> 中，
@@ -136,17 +260,12 @@ class HuiwenContentParser(HTMLParser):
 
     def __init__(self):
         super().__init__()
-        self.elements = []
-        self._text_buf = ''
-        self._skip_tags = {'script', 'style', 'noscript'}
         self._skip_depth = 0
         self._in_section = False
         self._section_depth = 0
 
     def handle_starttag(self, tag, attrs):
-        attrs_dict = dict(attrs)
-
-        if tag in self._skip_tags:
+        if tag in _SKIP_TAGS:
             self._skip_depth += 1
             return
 
@@ -166,14 +285,14 @@ class HuiwenContentParser(HTMLParser):
 
         elif tag == 'img':
             self._flush_text()
-            url = attrs_dict.get('data-src', '') or attrs_dict.get('src', '')
+            url = attrs.get('data-src', '') or attrs.get('src', '')
             if url and not url.startswith('data:'):
                 if url.startswith('//'):
                     url = 'https:' + url
                 self.elements.append({'type': 'image', 'url': url})
 
     def handle_endtag(self, tag):
-        if tag in self._skip_tags and self._skip_depth > 0:
+        if tag in _SKIP_TAGS and self._skip_depth > 0:
             self._skip_depth -= 1
             return
 
@@ -195,20 +314,21 @@ class HuiwenContentParser(HTMLParser):
             return
         text = data.strip()
         if text:
-            self._text_buf += text
+            self._text_buf.append(text)
 
     def _flush_text(self):
-        text = self._text_buf.strip()
-        self._text_buf = ''
-        if not text:
+        if not self._text_buf:
             return
-        text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
+        # 片段在 handle_data 中已 strip 且非空，拼接后无需再 strip
+        text = ''.join(self._text_buf)
+        self._text_buf.clear()
+        text = _ctrl_sub('', text)
         if not text:
             return
-        if _SIGNATURE_PATTERN.match(text):
+        if _is_signature_line(text):
             return
         # 过滤 "声明：" 提示文字
-        if text.startswith('声明：') or text.startswith('声明:'):
+        if text.startswith(_DISCLAIMER_PREFIXES):
             return
         self.elements.append({'type': 'text', 'text': text})
 
@@ -325,16 +445,24 @@ def _random_proxy(proxy_pool_text):
     return None
 
 
+# 图片下载线程池：所有文档共用，限制全局并发，避免多篇文档同时生成时连接数成倍放大
+_IMAGE_FETCH_WORKERS = 16
+
+# 图片下载共用一个 Session，同一图床的连接 keep-alive 复用，省去每张图的 TCP + TLS 握手
+# 连接池大小与图片线程池一致，并发下载时连接不会被丢弃重建
+_image_session = requests.Session()
+_image_session.headers['User-Agent'] = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+_image_adapter = HTTPAdapter(pool_connections=_IMAGE_FETCH_WORKERS, pool_maxsize=_IMAGE_FETCH_WORKERS)
+_image_session.mount('https://', _image_adapter)
+_image_session.mount('http://', _image_adapter)
+
+
 def download_image_bytes(url, referer='https://www.toutiao.com/', timeout=15):
     """下载图片并返回 bytes"""
     try:
         if url.startswith('//'):
             url = 'https:' + url
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
-            'Referer': referer,
-        }
-        resp = requests.get(url, headers=headers, timeout=timeout)
+        resp = _image_session.get(url, headers={'Referer': referer}, timeout=timeout)
         if resp.status_code == 200 and len(resp.content) > 500:
             return resp.content
     except Exception as e:
@@ -362,14 +490,53 @@ def crop_watermark(img_bytes):
         buf = io.BytesIO()
         # 保持原格式，默认 PNG
         fmt = img.format or 'PNG'
-        cropped.save(buf, format=fmt)
-        buf.seek(0)
+        save_kwargs = {}
+        if fmt == 'JPEG':
+            # 沿用原图的量化表和色度采样重新编码：不会按默认质量 75 二次压损，体积也与原图相当
+            save_kwargs['qtables'] = img.quantization
+            save_kwargs['subsampling'] = JpegImagePlugin.get_sampling(img)
+        cropped.save(buf, format=fmt, **save_kwargs)
         return buf.getvalue()
     except Exception as e:
         log.debug(f'裁剪水印失败: {e}')
         return img_bytes
 
 
+_image_pool = None
+_image_pool_lock = threading.Lock()
+
+
+def _get_image_pool():
+    global _image_pool
+    if _image_pool is None:
+        with _image_pool_lock:
+            if _image_pool is None:
+                _image_pool = ThreadPoolExecutor(max_workers=_IMAGE_FETCH_WORKERS, thread_name_prefix='image')
+    return _image_pool
+
+
+def _fetch_image(url, referer, need_crop):
+    """下载图片并按需裁掉水印，在图片线程池中执行"""
+    img_bytes = download_image_bytes(url, referer=referer)
+    if img_bytes and need_crop:
+        img_bytes = crop_watermark(img_bytes)
+    return img_bytes
+
+
+def prefetch_images(elements, referer, need_crop):
+    """
+    并发下载 elements 中所有网络图片（同一 URL 只下载一次）
+
+    Returns:
+        dict: {url: Future}，Future 结果为图片 bytes，失败为 None
+    """
+    urls = {e['url'] for e in elements if e['type'] == 'image' and not e.get('data') and e.get('url')}
+    if not urls:
+        return {}
+    pool = _get_image_pool()
+    return {url: pool.submit(_fetch_image, url, referer, need_crop) for url in urls}
+
+
 def read_docx_elements(doc_path):
     """
     从本地 docx 文件读取内容，返回 elements 列表（文字 + 图片）
@@ -379,10 +546,16 @@ def read_docx_elements(doc_path):
 
     Returns:
         list: [{'type': 'text', 'text': ...}, {'type': 'image', 'data': bytes}, ...]
+        图片加载失败的占位段落还原为 {'type': 'image', 'data': None}，
+        文字部分与下载时 text_char_count 统计的段落一致
     """
     log.info(f'读取本地 docx: {doc_path}')
     doc = Document(doc_path)
     elements = []
+    # 循环里用到的方法和属性先取成局部变量，段落多时省去每次的属性查找
+    append = elements.append
+    related_parts = doc.part.related_parts
+    is_signature_line = _is_signature_line
 
     for para in doc.paragraphs:
         # 检查段落中是否包含图片
@@ -407,17 +580,19 @@ def read_docx_elements(doc_path):
                     rId = blip.get('{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed')
                     if rId:
                         try:
-                            image_part = doc.part.related_parts[rId]
-                            elements.append({'type': 'image', 'data': image_part.blob})
+                            image_part = related_parts[rId]
+                            append({'type': 'image', 'data': image_part.blob})
                             has_image = True
                         except (KeyError, Exception) as e:
                             log.debug(f'读取图片失败: rId={rId}, err={e}')
 
         # 如果段落不含图片，且有文字内容，作为文本元素
         if not has_image:
-            text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', para.text.strip())
-            if text and not _SIGNATURE_PATTERN.match(text):
-                elements.append({'type': 'text', 'text': text})
+            text = _ctrl_sub('', para.text.strip())
+            if text == _IMAGE_FAILED_TEXT:
+                append({'type': 'image', 'data': None})
+            elif text and not is_signature_line(text):
+                append({'type': 'text', 'text': text})
 
     log.info(f'从 docx 读取到 {len(elements)} 个元素')
     return elements
@@ -426,10 +601,10 @@ def read_docx_elements(doc_path):
 def _clean_text(text):
     """清理文本中 XML 不兼容的控制字符（NULL、退格等）"""
     # 保留 tab(\x09)、换行(\x0A)、回车(\x0D)，去掉其余控制字符
-    return re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
+    return _ctrl_sub('', text)
 
 
-def generate_docx(elements, save_path, source_url=''):
+def generate_docx(elements, save_path, source_url='', ensure_dir=True):
     """
     根据解析后的元素列表生成纯文本 docx 文件（宋体）
 
@@ -440,6 +615,7 @@ def generate_docx(elements, save_path, source_url=''):
             - {'type': 'image', 'data': bytes} — 直接使用本地数据
         save_path: 保存文件完整路径
         source_url: 原文链接，用于确定图片下载 Referer 和是否裁水印
+        ensure_dir: 是否先创建所在目录；调用方已创建好目录时传 False，省去每篇一次 makedirs
     """
     doc = Document()
 
@@ -453,6 +629,9 @@ def generate_docx(elements, save_path, source_url=''):
     referer = _get_referer(source_type)
     need_crop = (source_type == 'toutiao')
 
+    # 先把全部图片并发下载，组装文档时按顺序取结果，不再逐张串行等待网络
+    image_futures = prefetch_images(elements, referer, need_crop)
+
     for elem in elements:
         if elem['type'] == 'text':
             doc.add_paragraph(_clean_text(elem['text']))
@@ -460,27 +639,65 @@ def generate_docx(elements, save_path, source_url=''):
         elif elem['type'] == 'image':
             img_bytes = elem.get('data')  # 本地图片数据
             if not img_bytes and elem.get('url'):
-                img_bytes = download_image_bytes(elem['url'], referer=referer)
-                if img_bytes and need_crop:
-                    img_bytes = crop_watermark(img_bytes)
+                img_bytes = image_futures[elem['url']].result()
 
             if img_bytes:
                 try:
                     doc.add_picture(io.BytesIO(img_bytes), width=Inches(5.5))
                 except Exception as e:
                     log.debug(f'插入图片失败: {e}')
-                    doc.add_paragraph('[图片加载失败]')
+                    doc.add_paragraph(_IMAGE_FAILED_TEXT)
             else:
-                doc.add_paragraph('[图片加载失败]')
+                doc.add_paragraph(_IMAGE_FAILED_TEXT)
 
-    # 确保目录存在
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
-    doc.save(save_path)
+    if ensure_dir:
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    try:
+        doc.save(save_path)
+    except FileNotFoundError:
+        # 调用方缓存的目录在运行中被删掉了，补建后重试一次
+        if ensure_dir:
+            raise
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+        doc.save(save_path)
     log.info(f'文档已保存: {save_path}')
     return save_path
 
 
-async def fetch_article_elements(article_url, headless=True, proxy_pool=''):
+# 提取正文时用不到的资源类型：只需要 HTML 和 img 的 data-src/src 属性，图片本身由 generate_docx 另行下载
+_BLOCKED_RESOURCE_TYPES = frozenset(('image', 'media', 'font'))
+
+
+async def _block_heavy_resources(route):
+    """context 路由处理：直接中止图片、音视频和字体请求，其余放行"""
+    if route.request.resource_type in _BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def _launch_browser(headless=True):
+    """启动 Playwright 和 Chromium，返回 (pw, browser)"""
+    bundled_browser_dir = configure_playwright_env()
+    if bundled_browser_dir:
+        log.info(f'使用内置 Playwright 浏览器目录: {bundled_browser_dir}')
+    pw = await async_playwright().start()
+    try:
+        browser = await pw.chromium.launch(
+            headless=headless,
+            args=[
+                '--disable-blink-features=AutomationControlled',
+                '--no-first-run',
+                '--disable-infobars',
+            ],
+        )
+    except Exception:
+        await pw.stop()
+        raise
+    return pw, browser
+
+
+async def fetch_article_elements(article_url, headless=True, proxy_pool='', browser=None):
     """
     打开文章页面，提取正文元素列表（文字段落 + 图片）
     自动识别 toutiao.com 和 feed.huiwen.co 使用不同的选择器和解析器
@@ -489,6 +706,7 @@ async def fetch_article_elements(article_url, headless=True, proxy_pool=''):
         article_url: 文章 URL
         headless: 是否使用无头模式
         proxy_pool: 代理池文本（每行一个代理），为空则不使用代理
+        browser: 已启动的浏览器，传入则复用（不关闭），否则本次临时启动
 
     Returns:
         list: [{'type': 'text', 'text': ...}, {'type': 'image', 'url': ...}, ...]
@@ -502,34 +720,30 @@ async def fetch_article_elements(article_url, headless=True, proxy_pool=''):
     content_selector = selector_map[source_type]
     log.info(f'提取文章内容: {article_url} (headless={headless}, type={source_type})')
 
-    proxy_config = _random_proxy(proxy_pool)
+    # 代理探活是同步网络请求，放到线程池里做，不阻塞事件循环上的其他页面
+    proxy_config = await asyncio.get_running_loop().run_in_executor(None, _random_proxy, proxy_pool) if proxy_pool else None
     fp = random_fingerprint()
-    bundled_browser_dir = configure_playwright_env()
-    if bundled_browser_dir:
-        log.info(f'使用内置 Playwright 浏览器目录: {bundled_browser_dir}')
-    pw = await async_playwright().start()
-    launch_kwargs = {
-        'headless': headless,
-        'args': [
-            '--disable-blink-features=AutomationControlled',
-            '--no-first-run',
-            '--disable-infobars',
-        ],
+    pw = None
+    if browser is None:
+        pw, browser = await _launch_browser(headless)
+
+    # 代理和指纹都挂在 context 上，共享浏览器时每篇文章仍然相互隔离
+    context_kwargs = {
+        'viewport': fp['viewport'],
+        'user_agent': fp['user_agent'],
+        'locale': fp['locale'],
+        'timezone_id': fp['timezone_id'],
+        'color_scheme': fp['color_scheme'],
+        'device_scale_factor': fp['device_scale_factor'],
+        'extra_http_headers': fp['extra_http_headers'],
     }
     if proxy_config:
-        launch_kwargs['proxy'] = proxy_config
-    browser = await pw.chromium.launch(**launch_kwargs)
+        context_kwargs['proxy'] = proxy_config
 
+    context = None
     try:
-        context = await browser.new_context(
-            viewport=fp['viewport'],
-            user_agent=fp['user_agent'],
-            locale=fp['locale'],
-            timezone_id=fp['timezone_id'],
-            color_scheme=fp['color_scheme'],
-            device_scale_factor=fp['device_scale_factor'],
-            extra_http_headers=fp['extra_http_headers'],
-        )
+        context = await browser.new_context(**context_kwargs)
+        await context.route('**/*', _block_heavy_resources)
         page = await context.new_page()
 
         await page.goto(article_url, wait_until='load', timeout=30000)
@@ -556,11 +770,12 @@ async def fetch_article_elements(article_url, headless=True, proxy_pool=''):
             }}
         ''')
 
-        await context.close()
-
     finally:
-        await browser.close()
-        await pw.stop()
+        if context is not None:
+            await context.close()
+        if pw is not None:
+            await browser.close()
+            await pw.stop()
 
     if not html:
         raise RuntimeError('未能提取到文章内容')
@@ -576,8 +791,106 @@ async def fetch_article_elements(article_url, headless=True, proxy_pool=''):
     return elements
 
 
+def text_char_count(elements):
+    """统计元素列表中文字段落的总字数"""
+    return sum(len(e['text']) for e in elements if e['type'] == 'text')
+
+
+async def _close_browser_and_pw(browser, pw):
+    """关闭浏览器及其 playwright 实例，忽略已断开等错误"""
+    if browser is not None:
+        try:
+            await browser.close()
+        except Exception:
+            pass
+    if pw is not None:
+        try:
+            await pw.stop()
+        except Exception:
+            pass
+
+
 class ArticleDownloader:
-    """文章下载器：提取内容 -> 生成 docx"""
+    """
+    文章下载器：提取内容 -> 生成 docx
+
+    调用 start() 后常驻一个浏览器，后续 download() 都复用它（每篇文章独立 context），
+    用完调用 close()；未 start() 时每次下载临时启动浏览器。
+    headless 变化时新开浏览器，旧浏览器等正在用它的抓取全部结束后再关闭，不打断在途页面。
+    同一实例只能在同一个事件循环中使用。
+    """
+
+    def __init__(self):
+        self._pw = None
+        self._browser = None
+        self._headless = None
+        self._start_lock = None
+        self._users = {}  # 浏览器 -> 正在用它抓取的数量
+        self._retired = {}  # 已被替换、等在途抓取结束后关闭的浏览器 -> 其 playwright 实例
+        # (save_dir, category) -> 已创建的分类文件夹，批量下载时避免重复拼路径和 mkdir
+        self._folders = {}
+
+    def _category_folder(self, save_dir, category):
+        key = (save_dir, category)
+        folder = self._folders.get(key)
+        if folder is None:
+            folder = os.path.join(save_dir, safe_filename(category)) if category else save_dir
+            os.makedirs(folder, exist_ok=True)
+            self._folders[key] = folder
+        return folder
+
+    async def start(self, headless=True):
+        """启动（或按 headless 重启）常驻浏览器"""
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._browser is not None and self._browser.is_connected() and self._headless == headless:
+                return
+            browser, pw = self._browser, self._pw
+            if browser is not None and self._users.get(browser):
+                # 还有抓取在用旧浏览器：先换下来，由最后一个用完的抓取负责关闭
+                self._retired[browser] = pw
+                self._browser = self._pw = self._headless = None
+            else:
+                await self._close_browser()
+            self._pw, self._browser = await _launch_browser(headless)
+            self._headless = headless
+            log.info(f'下载器浏览器已启动 (headless={headless})')
+
+    async def close(self):
+        """关闭常驻浏览器"""
+        if self._start_lock is None:
+            return
+        async with self._start_lock:
+            await self._close_browser()
+            retired, self._retired = self._retired, {}
+            for browser, pw in retired.items():
+                await _close_browser_and_pw(browser, pw)
+
+    async def _close_browser(self):
+        browser, pw = self._browser, self._pw
+        self._browser = self._pw = self._headless = None
+        await _close_browser_and_pw(browser, pw)
+
+    async def fetch_elements(self, article_url, headless=True, proxy_pool=''):
+        """提取文章元素（见 fetch_article_elements），已 start() 时复用常驻浏览器"""
+        browser = self._browser if self._browser is not None and self._browser.is_connected() else None
+        if browser is None:
+            return await fetch_article_elements(article_url, headless=headless, proxy_pool=proxy_pool)
+        # 记录在用数，start() 换浏览器时不会把在途页面所在的浏览器关掉
+        self._users[browser] = self._users.get(browser, 0) + 1
+        try:
+            return await fetch_article_elements(
+                article_url, headless=headless, proxy_pool=proxy_pool, browser=browser,
+            )
+        finally:
+            remaining = self._users[browser] - 1
+            if remaining:
+                self._users[browser] = remaining
+            else:
+                del self._users[browser]
+                if browser in self._retired:
+                    await _close_browser_and_pw(browser, self._retired.pop(browser))
 
     async def download(self, article_url, save_dir, category='', title='', headless=True, proxy_pool=''):
         """
@@ -594,7 +907,14 @@ class ArticleDownloader:
         Returns:
             str: 保存的文件路径
         """
-        elements = await fetch_article_elements(article_url, headless=headless, proxy_pool=proxy_pool)
+        save_path, _ = await self.download_with_count(
+            article_url, save_dir, category=category, title=title, headless=headless, proxy_pool=proxy_pool,
+        )
+        return save_path
+
+    async def download_with_count(self, article_url, save_dir, category='', title='', headless=True, proxy_pool=''):
+        """同 download()，额外返回正文字数：(save_path, char_count)"""
+        elements = await self.fetch_elements(article_url, headless=headless, proxy_pool=proxy_pool)
 
         # 如果没有传入标题，使用默认名称
         if not title:
@@ -602,13 +922,11 @@ class ArticleDownloader:
 
         # 构建保存路径: save_dir/category/title.docx
         filename = safe_filename(title) + '.docx'
-        if category:
-            folder = os.path.join(save_dir, safe_filename(category))
-        else:
-            folder = save_dir
-        save_path = os.path.join(folder, filename)
+        save_path = os.path.join(self._category_folder(save_dir, category), filename)
 
-        # 生成 docx
-        generate_docx(elements, save_path, source_url=article_url)
+        # 生成 docx（下载图片、写盘都是阻塞操作）交给线程池，事件循环继续驱动其他页面
+        await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(generate_docx, elements, save_path, source_url=article_url, ensure_dir=False),
+        )
 
-        return save_path
+        return save_path, text_char_count(elements)
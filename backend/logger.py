@@ -5,7 +5,11 @@
 
 import os
 import sys
+import json
+import time
+import queue
 import logging
+import threading
 from datetime import datetime
 
 # 项目根目录
@@ -68,3 +72,98 @@ def setup_logger():
 def get_logger(name='toutiao'):
     """获取子 logger"""
     return logging.getLogger(f'toutiao.{name}')
+
+
+# 调试事件日志（JSON Lines）：默认关闭，设置环境变量 TOUTIAO_DEBUG=1 开启
+# 调用方先判断 DEBUG_LOG_ENABLED 再 emit，关闭时连记录字典都不用构造
+DEBUG_LOG_ENABLED = os.environ.get('TOUTIAO_DEBUG') == '1'
+# 日志路径，默认写在 logs 目录下，可用环境变量 TOUTIAO_DEBUG_LOG 指定
+DEBUG_LOG_PATH = os.environ.get('TOUTIAO_DEBUG_LOG') or os.path.join(LOGS_DIR, 'debug.log')
+
+# 复用一个编码器实例，省去 json.dumps 每次检查参数、新建编码器
+_encode_json = json.JSONEncoder().encode
+
+
+class DebugLogger:
+    """
+    调试事件日志：emit() 只把编码好的一行放进队列，由后台线程攒批一次写入
+    文件只打开一次，多线程并发 emit 时不再反复 open/close，也不争用文件
+    写入失败（如目录不存在）时丢弃记录，不影响调用方
+    """
+
+    def __init__(self, path, max_batch=64, interval=1.0):
+        self._path = path
+        self._max_batch = max_batch
+        self._interval = interval
+        self._queue = queue.SimpleQueue()
+        self._file = None
+        self._disabled = False
+        self._write_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def emit(self, location, message, data):
+        line = _encode_json({
+            'location': location,
+            'message': message,
+            'data': data,
+            'timestamp': time.time_ns() // 1000000,
+        }) + '\n'
+        self._queue.put(line)
+        if self._thread is None:
+            self._start()
+
+    def flush(self, timeout=5):
+        """等待后台线程把已 emit 的记录全部写入（退出时调用）"""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._drain, name='debug-log', daemon=True)
+                self._thread.start()
+
+    def _drain(self):
+        while True:
+            lines = []
+            flushed = None
+            deadline = time.monotonic() + self._interval
+            while len(lines) < self._max_batch:
+                # 空批时一直等待第一条，有积攒后最多等到 deadline
+                remaining = deadline - time.monotonic() if lines else None
+                if remaining is not None and remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    flushed = item
+                    break
+                lines.append(item)
+            self._write(lines)
+            if flushed is not None:
+                flushed.set()
+
+    def _write(self, lines):
+        if not lines:
+            return
+        with self._write_lock:
+            if self._disabled:
+                return
+            try:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+                    self._file = open(self._path, 'a', encoding='utf-8')
+                self._file.write(''.join(lines))
+                self._file.flush()
+            except OSError as e:
+                self._disabled = True
+                get_logger('debug').warning(f'调试日志写入失败，后续记录将丢弃: {e}')
+
+
+debug_log = DebugLogger(DEBUG_LOG_PATH)
@@ -4,12 +4,18 @@
 """
 
 import os
+import time
+import queue
 import threading
+from contextlib import contextmanager
 from datetime import datetime
 from peewee import (
-    SqliteDatabase, Model, CharField, TextField, IntegerField,
+    Model, CharField, TextField, IntegerField,
     BooleanField, DateTimeField, BigIntegerField,
+    Case, chunked,
 )
+from playhouse.pool import PooledSqliteDatabase
+from playhouse.migrate import SqliteMigrator, migrate
 from logger import get_logger
 
 log = get_logger('db')
@@ -19,9 +25,17 @@ DB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'databas
 os.makedirs(DB_DIR, exist_ok=True)
 DB_PATH = os.path.join(DB_DIR, 'toutiao.db')
 
-db = SqliteDatabase(DB_PATH, pragmas={
+# 连接池：线程通过 db_session() 取用连接，用完归还复用，省去反复建连和执行 PRAGMA
+# timeout 为连接池耗尽时等待空闲连接的秒数；连接会在线程间流转，需关闭 check_same_thread
+# 正在使用的连接不会被回收，max_connections 是同时持有连接的线程数上限：
+# 只有 JS API 调用和 BatchCommitter 线程持有连接，批量改写/下载的 worker 不查库、不进 db_session，
+# 因此并发线程数（rewriteWorkers 等）不受这里限制；新增长时间运行的 worker 时不要给它包 db_session
+db = PooledSqliteDatabase(DB_PATH, max_connections=32, stale_timeout=300, timeout=30, check_same_thread=False, pragmas={
     'journal_mode': 'wal',
+    'synchronous': 'normal',  # WAL 模式下 NORMAL 即可保证一致性，省去每次提交的 fsync
     'cache_size': -1024 * 64,
+    'temp_store': 'memory',
+    'mmap_size': 256 * 1024 * 1024,
     'foreign_keys': 1,
     'busy_timeout': 30000,  # 等待锁最多 30 秒
 })
@@ -30,6 +44,23 @@ db = SqliteDatabase(DB_PATH, pragmas={
 _write_lock = threading.Lock()
 
 
+@contextmanager
+def db_session():
+    """
+    线程内数据库会话：进入时从连接池取连接，退出时归还
+    可嵌套，只有最外层负责归还；也可作装饰器使用 @db_session()
+    pywebview 每次 JS 调用都在新线程里执行，不归还的连接会一直占着连接池
+    """
+    if not db.is_closed():
+        yield
+        return
+    db.connect()
+    try:
+        yield
+    finally:
+        db.close()
+
+
 class BaseModel(Model):
     class Meta:
         database = db
@@ -44,7 +75,7 @@ class Account(BaseModel):
     like_count = CharField(default='', help_text='获赞数')
     follow_count = CharField(default='', help_text='关注数')
     auth_info = CharField(default='', help_text='认证信息')
-    created_at = DateTimeField(default=datetime.now, help_text='创建时间')
+    created_at = DateTimeField(default=datetime.now, index=True, help_text='创建时间')
     updated_at = DateTimeField(default=datetime.now, help_text='更新时间')
 
     class Meta:
@@ -78,7 +109,6 @@ class Setting(BaseModel):
     def get_val(key, default=None):
         """获取设置值"""
         try:
-            db.connect(reuse_if_open=True)
             row = Setting.get_or_none(Setting.key == key)
             if row:
                 import json
@@ -91,7 +121,6 @@ class Setting(BaseModel):
     def set_val(key, value):
         """设置值"""
         import json
-        db.connect(reuse_if_open=True)
         with _write_lock:
             Setting.insert(key=key, value=json.dumps(value, ensure_ascii=False)).on_conflict(
                 conflict_target=[Setting.key],
@@ -103,7 +132,6 @@ class Setting(BaseModel):
         """获取所有设置，合并默认值"""
         result = dict(defaults) if defaults else {}
         try:
-            db.connect(reuse_if_open=True)
             import json
             for row in Setting.select():
                 try:
@@ -118,7 +146,6 @@ class Setting(BaseModel):
     def save_all(data):
         """批量保存设置"""
         import json
-        db.connect(reuse_if_open=True)
         with _write_lock, db.atomic():
             for k, v in data.items():
                 Setting.insert(key=k, value=json.dumps(v, ensure_ascii=False)).on_conflict(
@@ -155,7 +182,8 @@ class Article(BaseModel):
     user_id = CharField(default='', index=True, help_text='作者ID')
 
     is_rewritten = BooleanField(default=False, index=True, help_text='是否已改写')
-    doc_path = CharField(default='', help_text='文档路径')
+    doc_path = CharField(default='', index=True, help_text='文档路径')
+    char_count = IntegerField(default=0, help_text='正文字数（下载时统计，0 表示未知）')
 
     created_at = DateTimeField(default=datetime.now, help_text='入库时间')
     updated_at = DateTimeField(default=datetime.now, help_text='更新时间')
@@ -163,6 +191,10 @@ class Article(BaseModel):
     class Meta:
         table_name = 'articles'
         order_by = ['-publish_time']
+        indexes = (
+            # 按改写状态筛选并按发布时间倒序分页（文章列表、批量改写）
+            (('is_rewritten', 'publish_time'), False),
+        )
 
     def to_dict(self):
         return {
@@ -190,17 +222,126 @@ class Article(BaseModel):
             'user_id': self.user_id,
             'is_rewritten': self.is_rewritten,
             'doc_path': self.doc_path,
+            'char_count': self.char_count,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else '',
         }
 
 
+_STOP = object()
+
+
+class BatchCommitter:
+    """
+    把多个线程产生的单行写入合并成批量写入：
+    后台线程攒够 max_batch 条或等满 interval 秒提交一次，commit_fn 接收本批条目列表
+    某批提交失败时等 retry_delay 秒重试一次，仍失败则记下这批条目
+    close() 提交剩余条目并结束后台线程，返回最终提交失败的条目列表
+    """
+
+    def __init__(self, commit_fn, max_batch=100, interval=2.0, retry_delay=1.0):
+        self._commit_fn = commit_fn
+        self._max_batch = max_batch
+        self._interval = interval
+        self._retry_delay = retry_delay
+        self._failed = []
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='batch-committer', daemon=True)
+        self._thread.start()
+
+    def put(self, item):
+        self._queue.put(item)
+
+    def close(self):
+        """提交剩余条目并等待后台线程结束，返回提交失败的条目列表（全部成功时为空）"""
+        self._queue.put(_STOP)
+        self._thread.join()
+        return self._failed
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self._interval
+            while len(batch) < self._max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                self._commit(batch)
+
+    def _commit(self, batch):
+        for attempt in range(2):
+            try:
+                with db_session():
+                    self._commit_fn(batch)
+                return
+            except Exception as e:
+                if attempt == 0:
+                    log.warning(f'批量提交失败 ({len(batch)} 条)，{self._retry_delay}s 后重试: {e}')
+                    time.sleep(self._retry_delay)
+                else:
+                    log.error(f'批量提交重试仍失败 ({len(batch)} 条): {e}', exc_info=True)
+                    self._failed.extend(batch)
+
+
+def apply_article_changes(changes):
+    """
+    在一个事务里批量落地文章状态变更，changes 为 [('rewritten' | 'deleted', article_id), ...]
+    配合 BatchCommitter 使用，把多个 worker 的单行更新/删除合并成两条语句
+    """
+    rewritten = [aid for kind, aid in changes if kind == 'rewritten']
+    deleted = [aid for kind, aid in changes if kind == 'deleted']
+    with _write_lock, db.atomic():
+        # 每批最多 100 条（BatchCommitter 默认 max_batch），IN 列表不会超过 SQLite 变量上限
+        if rewritten:
+            Article.update(is_rewritten=True).where(Article.id.in_(rewritten)).execute()
+        if deleted:
+            Article.delete().where(Article.id.in_(deleted)).execute()
+
+
+def set_doc_paths(updates):
+    """
+    批量回写下载结果，updates 为 [(article_id, doc_path, char_count), ...]
+    每批一条 UPDATE ... CASE id（每行 5 个绑定参数，150 行一批）
+    """
+    with _write_lock, db.atomic():
+        for batch in chunked(updates, 150):
+            Article.update(
+                doc_path=Case(Article.id, [(aid, path) for aid, path, _ in batch]),
+                char_count=Case(Article.id, [(aid, cnt) for aid, _, cnt in batch]),
+            ).where(Article.id.in_([aid for aid, _, _ in batch])).execute()
+
+
+def _migrate():
+    """给旧库补上新增的列（create_tables 不会修改已存在的表）"""
+    columns = {c.name for c in db.get_columns(Article._meta.table_name)}
+    operations = []
+    migrator = SqliteMigrator(db)
+    if 'char_count' not in columns:
+        operations.append(migrator.add_column(Article._meta.table_name, 'char_count', Article.char_count))
+    if operations:
+        with _write_lock, db.atomic():
+            migrate(*operations)
+        log.info(f'数据库迁移完成: {len(operations)} 项')
+
+
 def init_db():
     """初始化数据库，创建表"""
     db.connect(reuse_if_open=True)
     db.create_tables([Account, Setting, Article], safe=True)
+    _migrate()
     log.info(f'数据库初始化完成: {DB_PATH}')
 
 
+@db_session()
 def save_articles(article_dicts, category=''):
     """
     批量保存文章到数据库，已存在的更新计数数据，新的插入
@@ -6,7 +6,11 @@ RewriteClient - 文章改写客户端
 
 import re
 import time
+import random
+import threading
 import requests
+from requests.adapters import HTTPAdapter
+from email.utils import parsedate_to_datetime
 from logger import get_logger
 
 log = get_logger('rewriter')
@@ -54,33 +58,236 @@ SYSTEM_PROMPT = """你是一个有十年经验的自媒体老手，写文章就
 # 遇到这些状态码时自动重试
 _RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
 _MAX_RETRIES = 3
+# HTTP 层重试的退避参数（秒）：2、4、8… 封顶 30，另加随机抖动
+_RETRY_BACKOFF_BASE = 2
+_RETRY_BACKOFF_CAP = 30
+# 429 全局冷却的上限（秒）：Retry-After 过大时按此截断，单次限流不至于让所有 worker 停摆太久
+_COOLDOWN_CAP = 60
 _MAX_REWRITE_ATTEMPTS = 3
 
 # 敏感词等需删文的错误，不重试，由 api 层删文
 SENSITIVE_PHRASE = 'Content contains sensitive words'
 
+# 段落分隔行：至少 4 个连续短横线独占一行
+_SEP_LINE_RE = re.compile(r'^[^\S\n]*-{4,}[^\S\n]*$')
+
+# 代码块包裹标记
+_CODE_FENCE_RE = re.compile(r'```(?:markdown)?\s*')
+
+# XML 不兼容的控制字符（保留 tab、换行、回车）
+_CTRL_RE = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]')
+
 
 class SensitiveContentError(Exception):
     """LLM 返回内容包含敏感词等需删文的错误"""
     pass
 
 
+class RewriteCancelled(Exception):
+    """等待冷却或退避期间收到停止信号，放弃本篇"""
+    pass
+
+
+class _Cooldown:
+    """
+    进程内共享的限流冷却：任一线程收到 429 后，所有线程在冷却结束前都不再发请求
+    单次冷却不超过 max_seconds；等待可被停止信号打断
+    """
+
+    def __init__(self, max_seconds=_COOLDOWN_CAP):
+        self._until = 0.0
+        self._max_seconds = max_seconds
+        self._cond = threading.Condition()
+
+    def wait(self, cancel=None, deadline=None):
+        """
+        冷却期内阻塞，直到冷却结束
+        cancel 为 threading.Event，等待中被 set 时抛出 RewriteCancelled（最多延迟 1 秒响应）
+        deadline 为本篇截止时间（time.monotonic() 时间点），冷却结束晚于它时不等，直接抛出 TimeoutError
+        """
+        with self._cond:
+            while True:
+                if cancel is not None and cancel.is_set():
+                    raise RewriteCancelled('改写已停止')
+                if deadline is not None and self._until >= deadline:
+                    raise TimeoutError('单篇改写超出时长预算（限流冷却中）')
+                remaining = self._until - time.monotonic()
+                if remaining <= 0:
+                    return
+                self._cond.wait(remaining if cancel is None else min(remaining, 1.0))
+
+    def extend(self, seconds):
+        """把冷却截止时间延后到至少 now + seconds（seconds 超过上限按上限算）"""
+        with self._cond:
+            self._until = max(self._until, time.monotonic() + min(seconds, self._max_seconds))
+
+
+_llm_cooldown = _Cooldown()
+
+
+class TokenBucket:
+    """令牌桶限速：平均每秒 rate 个令牌，最多积攒 capacity 个（允许的突发量）"""
+
+    def __init__(self, rate=1.0, capacity=1):
+        self.rate = float(rate)
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，桶空时阻塞到下一个令牌生成"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _parse_retry_after(resp):
+    """解析 Retry-After 响应头（秒数或 HTTP 日期），无法解析返回 None"""
+    value = (resp.headers.get('Retry-After') or '').strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return None
+
+
+def _is_rate_limited(exc):
+    """是否为 HTTP 429 限流错误"""
+    return (isinstance(exc, requests.exceptions.HTTPError)
+            and exc.response is not None and exc.response.status_code == 429)
+
+
+def is_retryable_error(exc):
+    """
+    判断改写失败是否值得再试一次：
+    限流/服务端错误、超时、连接失败，以及模型输出格式不合格（ValueError，换一次采样通常就好）
+    鉴权失败、参数错误、敏感词等直接失败
+    """
+    if isinstance(exc, SensitiveContentError):
+        return False
+    if isinstance(exc, requests.exceptions.HTTPError):
+        resp = exc.response
+        return resp is not None and resp.status_code in _RETRY_STATUS_CODES
+    return isinstance(exc, (
+        TimeoutError,
+        ConnectionError,
+        requests.exceptions.Timeout,
+        requests.exceptions.ConnectionError,
+        ValueError,
+    ))
+
+
+def backoff_delay(attempt, base=2, cap=60):
+    """
+    第 attempt 次重试（从 1 开始）前的等待秒数：min(base * 2^(attempt-1), cap) 再加 0~1 秒随机抖动
+    抖动让同时失败的多个线程错开重试，不会一起再撞一次上游
+    """
+    return min(base * 2 ** (attempt - 1), cap) + random.random()
+
+
+def time_left(deadline, limit=None):
+    """
+    距 deadline（time.monotonic() 时间点）的剩余秒数，不超过 limit；deadline 为 None 时直接返回 limit
+    已经超时则抛出 TimeoutError
+    """
+    if deadline is None:
+        return limit
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise TimeoutError('单篇改写超出时长预算')
+    return left if limit is None else min(limit, left)
+
+
+def _sleep_before(deadline, seconds, cancel=None):
+    """
+    退避等待；等完会超过 deadline 时不再白等，直接抛出 TimeoutError
+    cancel（threading.Event）被 set 时立即结束等待并抛出 RewriteCancelled
+    """
+    if deadline is not None and time.monotonic() + seconds >= deadline:
+        raise TimeoutError('单篇改写超出时长预算')
+    if cancel is None:
+        time.sleep(seconds)
+    elif cancel.wait(seconds):
+        raise RewriteCancelled('改写已停止')
+
+
+def call_with_backoff(func, max_retries=3, base=2, cap=60, label='', deadline=None, cancel=None):
+    """
+    调用 func()，遇到可重试错误时按指数退避 + 随机抖动重试（等待时间见 backoff_delay）
+    不可重试的错误立即抛出
+
+    Args:
+        func: 无参可调用对象
+        max_retries: 最多尝试次数
+        base: 退避基数（秒）
+        cap: 单次等待上限（秒）
+        label: 日志附加信息
+        deadline: 整体截止时间（time.monotonic() 时间点），到点不再重试
+        cancel: 停止信号（threading.Event），退避等待中被 set 时抛出 RewriteCancelled
+    """
+    max_retries = max(1, int(max_retries))
+    for attempt in range(1, max_retries + 1):
+        try:
+            return func()
+        except Exception as e:
+            if not is_retryable_error(e):
+                raise
+            if attempt >= max_retries:
+                log.error(f'改写失败，已重试 {max_retries} 次{label}: {e}')
+                raise
+            delay = backoff_delay(attempt, base, cap)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                log.error(f'改写失败，已到单篇时长上限，不再重试{label}: {e}')
+                raise
+            if _is_rate_limited(e):
+                # 限流说明上游整体过载：退避时间同步到全局冷却，其他线程也先停手，不再白白消耗配额
+                _llm_cooldown.extend(delay)
+            log.warning(f'改写失败 (第 {attempt}/{max_retries} 次)，{delay:.1f}s 后重试{label}: {e}')
+            _sleep_before(None, delay, cancel)
+
+
 class RewriteClient:
     """调用大模型 API 改写文章"""
 
-    def __init__(self, api_base, api_key, model, timeout=120):
+    def __init__(self, api_base, api_key, model, timeout=120, pool_size=10, cancel_event=None):
         self.api_base = api_base.rstrip('/')
         self.api_key = api_key
         self.model = model
         self.timeout = timeout
-
-    def rewrite(self, title, paragraphs):
+        # 复用 HTTP 连接（keep-alive），多篇文章共用一个客户端时省去每次的 TCP + TLS 握手
+        # pool_size 与并发改写线程数一致，避免连接池满后频繁丢弃连接
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        # 停止信号（threading.Event）：set 后限流冷却和重试退避的等待立即结束，抛出 RewriteCancelled
+        self._cancel = cancel_event
+
+    def close(self):
+        """关闭底层连接池"""
+        self._session.close()
+
+    def rewrite(self, title, paragraphs, deadline=None):
         """
         改写文章标题和正文段落
 
         Args:
             title: 原始标题
             paragraphs: 原始正文段落列表
+            deadline: 截止时间（time.monotonic() 时间点），每次请求的超时不超过剩余时间，到点抛出 TimeoutError
 
         Returns:
             (new_title, new_paragraphs) 元组
@@ -116,7 +323,7 @@ class RewriteClient:
 
         for rewrite_attempt in range(_MAX_REWRITE_ATTEMPTS):
             # 带重试的 HTTP 请求
-            resp = self._request_with_retry(url, headers, payload)
+            resp = self._request_with_retry(url, headers, payload, deadline)
 
             data = resp.json()
             # 先检查 API 返回的 error 字段（部分厂商 200 也带 error）
@@ -170,34 +377,44 @@ class RewriteClient:
 
         raise ValueError('改写多次重试后仍然失败')
 
-    def _request_with_retry(self, url, headers, payload):
+    def _request_with_retry(self, url, headers, payload, deadline=None):
         """带重试的 HTTP 请求"""
         for attempt in range(_MAX_RETRIES):
             try:
-                resp = requests.post(url, headers=headers, json=payload, timeout=self.timeout)
+                # 其他线程刚被限流时先等冷却结束，避免一起撞 429
+                _llm_cooldown.wait(self._cancel, deadline)
+                resp = self._session.post(url, headers=headers, json=payload, timeout=time_left(deadline, self.timeout))
                 if not resp.ok:
                     body = (resp.text or '')[:500]
                     if SENSITIVE_PHRASE in body or ('sensitive' in body.lower() and 'word' in body.lower()):
                         raise SensitiveContentError(body or f'HTTP {resp.status_code}')
+                if resp.status_code == 429:
+                    # 限流：冷却对所有线程生效，优先遵循 Retry-After（不超过 _COOLDOWN_CAP）
+                    retry_after = _parse_retry_after(resp)
+                    wait = min(retry_after, _COOLDOWN_CAP) if retry_after is not None else backoff_delay(attempt + 1, _RETRY_BACKOFF_BASE, _RETRY_BACKOFF_CAP)
+                    _llm_cooldown.extend(wait)
+                    if attempt < _MAX_RETRIES - 1:
+                        log.warning(f'LLM 请求被限流 (HTTP 429)，全局冷却 {wait:.0f}s 后重试 ({attempt + 1}/{_MAX_RETRIES})')
+                        continue
                 if resp.status_code in _RETRY_STATUS_CODES and attempt < _MAX_RETRIES - 1:
-                    wait = (attempt + 1) * 5
-                    log.warning(f'LLM 请求失败 (HTTP {resp.status_code})，{wait}s 后重试 ({attempt + 1}/{_MAX_RETRIES})')
-                    time.sleep(wait)
+                    wait = backoff_delay(attempt + 1, _RETRY_BACKOFF_BASE, _RETRY_BACKOFF_CAP)
+                    log.warning(f'LLM 请求失败 (HTTP {resp.status_code})，{wait:.1f}s 后重试 ({attempt + 1}/{_MAX_RETRIES})')
+                    _sleep_before(deadline, wait, self._cancel)
                     continue
                 resp.raise_for_status()
                 return resp
             except requests.exceptions.Timeout:
                 if attempt < _MAX_RETRIES - 1:
-                    wait = (attempt + 1) * 5
-                    log.warning(f'LLM 请求超时，{wait}s 后重试 ({attempt + 1}/{_MAX_RETRIES})')
-                    time.sleep(wait)
+                    wait = backoff_delay(attempt + 1, _RETRY_BACKOFF_BASE, _RETRY_BACKOFF_CAP)
+                    log.warning(f'LLM 请求超时，{wait:.1f}s 后重试 ({attempt + 1}/{_MAX_RETRIES})')
+                    _sleep_before(deadline, wait, self._cancel)
                     continue
                 raise TimeoutError(f'LLM 请求超时 ({self.timeout}s)')
             except requests.exceptions.ConnectionError:
                 if attempt < _MAX_RETRIES - 1:
-                    wait = (attempt + 1) * 5
-                    log.warning(f'LLM 连接失败，{wait}s 后重试 ({attempt + 1}/{_MAX_RETRIES})')
-                    time.sleep(wait)
+                    wait = backoff_delay(attempt + 1, _RETRY_BACKOFF_BASE, _RETRY_BACKOFF_CAP)
+                    log.warning(f'LLM 连接失败，{wait:.1f}s 后重试 ({attempt + 1}/{_MAX_RETRIES})')
+                    _sleep_before(deadline, wait, self._cancel)
                     continue
                 raise
 
@@ -218,16 +435,17 @@ class RewriteClient:
         """
         # 去掉代码块包裹（以防万一）
         if '```' in content:
-            content = re.sub(r'```(?:markdown)?\s*', '', content)
+            content = _CODE_FENCE_RE.sub('', content)
             content = content.strip()
 
         # 按 -------- 分割（逐行检测，至少 4 个连续短横线独占一行）
         # 比正则切分更可靠：不受连续分隔符、末尾无换行等边界条件影响
-        _sep_re = re.compile(r'^[^\S\n]*-{4,}[^\S\n]*$')
+        # 不含 '----' 的行不可能是分隔行，先用子串判断跳过正则
+        sep_match = _SEP_LINE_RE.match
         parts = []
         current_lines = []
         for line in content.split('\n'):
-            if _sep_re.match(line):
+            if '----' in line and sep_match(line):
                 parts.append('\n'.join(current_lines))
                 current_lines = []
             else:
@@ -258,7 +476,7 @@ class RewriteClient:
         for p in parts[1:]:
             text = p.strip()
             # 清理控制字符
-            text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
+            text = _CTRL_RE.sub('', text)
             paragraphs.append(text)  # 空段落也保留，维持计数
 
         if not any(p for p in paragraphs):
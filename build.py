@@ -139,6 +139,7 @@ def run_pyinstaller():
         '--hidden-import', 'webview',
         '--hidden-import', 'peewee',
         '--hidden-import', 'docx',
+        '--hidden-import', 'lxml.etree',
         '--hidden-import', 'PIL',
         '--hidden-import', 'requests',
     ])
@@ -0,0 +1,33 @@
+"""
+测试公用：把 backend 加入 sys.path；需要数据库的测试改用临时库，结束后还原
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+
+def use_temp_db(testcase):
+    """当前测试改用临时数据库文件（已建表），测试结束时关闭连接、删除文件并还原路径"""
+    import models
+
+    tmp = tempfile.mkdtemp()
+    original = models.db.database
+    if not models.db.is_closed():
+        models.db.close()
+    models.db.close_all()
+    models.db.database = os.path.join(tmp, 'test.db')
+    models.init_db()
+
+    def _restore():
+        if not models.db.is_closed():
+            models.db.close()
+        models.db.close_all()
+        models.db.database = original
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    testcase.addCleanup(_restore)
+    return tmp
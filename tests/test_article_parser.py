@@ -0,0 +1,100 @@
+"""
+正文解析回归测试：结果需与原先基于 html.parser 的实现一致
+运行：python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from article_downloader import parse_article_html, parse_huiwen_html  # noqa: E402
+
+
+def _text(text):
+    return {'type': 'text', 'text': text}
+
+
+class ParagraphSplitTest(unittest.TestCase):
+    """<p> 内嵌块级元素时不能被拆成多段"""
+
+    def test_div_inside_p(self):
+        html = '<p>a<div>b</div>c</p>'
+        self.assertEqual(parse_article_html(html), [_text('abc')])
+        self.assertEqual(parse_huiwen_html(html), [_text('abc')])
+
+    def test_list_inside_p(self):
+        html = '<p>x<ul><li>1</li><li>2</li></ul>y</p>z'
+        self.assertEqual(parse_article_html(html), [_text('x12y'), _text('z')])
+        self.assertEqual(parse_huiwen_html(html), [_text('x12y'), _text('z')])
+
+    def test_h1_inside_p_is_skipped(self):
+        html = '<p>a<h1>标题</h1>b</p><p>c</p>'
+        self.assertEqual(parse_article_html(html), [_text('a'), _text('b'), _text('c')])
+
+    def test_stray_end_tag_keeps_fragments_separate(self):
+        # 多余的结束标签两侧的文字各自 strip 后再拼接
+        html = '<p>甲 </strong> 乙</p>'
+        self.assertEqual(parse_article_html(html), [_text('甲乙')])
+
+
+class RawMarkupTest(unittest.TestCase):
+    """不构成标签的 '<' 与自闭合标签的属性，按 html.parser 的方式处理"""
+
+    def test_bare_lt_is_separate_fragment(self):
+        # html.parser 把裸 '<' 单独作为一段文字回调，两侧片段各自 strip
+        self.assertEqual(parse_article_html('<p>1 < 2 > 0</p>'), [_text('1<2 > 0')])
+        self.assertEqual(parse_huiwen_html('<p>1 < 2 > 0</p>'), [_text('1<2 > 0')])
+
+    def test_trailing_lt_dropped(self):
+        self.assertEqual(parse_article_html('<p>a</p>b<'), [_text('a'), _text('b')])
+
+    def test_unquoted_attr_keeps_trailing_slash(self):
+        html = '<img src=/a/b.jpg/>'
+        self.assertEqual(parse_article_html(html), [{'type': 'image', 'url': '/a/b.jpg/'}])
+        self.assertEqual(parse_huiwen_html(html), [{'type': 'image', 'url': '/a/b.jpg/'}])
+
+    def test_self_closing_quoted_attr(self):
+        self.assertEqual(parse_article_html('<img src="http://i/1.jpg" />'), [{'type': 'image', 'url': 'http://i/1.jpg'}])
+
+
+class ControlCharTest(unittest.TestCase):
+    """控制字符直接删除，不能变成 U+FFFD 留在正文里"""
+
+    def test_nul_removed(self):
+        html = '<p>a\x00b</p>'
+        self.assertEqual(parse_article_html(html), [_text('ab')])
+        self.assertEqual(parse_huiwen_html(html), [_text('ab')])
+
+    def test_other_ctrl_removed(self):
+        self.assertEqual(parse_article_html('<p>a\x01\x0bb\x7f</p>'), [_text('ab')])
+
+
+class ContentTest(unittest.TestCase):
+
+    def test_article_skips_meta_script_and_signature(self):
+        html = (
+            '<h1>标题</h1><div class="article-meta"><span>作者</span><div>x</div></div>'
+            '<p>第一段 &amp; 内容</p><p><img data-src="http://a/1.jpg" src="data:xx"></p>'
+            '<script>if (a<b) x = "</p>";</script><p>文| 杨磊</p><p> 尾<strong>部</strong> </p>'
+        )
+        self.assertEqual(parse_article_html(html), [
+            _text('第一段 & 内容'),
+            {'type': 'image', 'url': 'http://a/1.jpg'},
+            _text('尾部'),
+        ])
+
+    def test_huiwen_sections_and_disclaimer(self):
+        html = (
+            '<section><span>段一</span><section><span>嵌套</span></section></section>'
+            '<div class="yl-img-wrapper"><img src="//c/3.jpg"/></div><p>声明：xxx</p>'
+        )
+        self.assertEqual(parse_huiwen_html(html), [
+            _text('段一嵌套'),
+            {'type': 'image', 'url': 'https://c/3.jpg'},
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
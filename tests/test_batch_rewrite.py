@@ -0,0 +1,103 @@
+"""
+批量改写汇总测试：连续失败快速中止、停止信号（LLM 客户端、docx 读写用假实现替换）
+运行：python -m unittest discover tests
+"""
+
+import os
+import unittest
+from unittest import mock
+
+from support import use_temp_db
+
+import api  # noqa: E402
+from models import Article  # noqa: E402
+
+
+class _NoLimit:
+    """不限速的令牌桶，测试不等 1 次/秒的节奏"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def acquire(self):
+        pass
+
+
+def _fake_client(fail_titles):
+    class FakeClient:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def close(self):
+            pass
+
+        def rewrite(self, title, paragraphs, deadline=None):
+            if title in fail_titles:
+                raise RuntimeError('HTTP 401 Unauthorized')  # 不可重试
+            return '新' + title, paragraphs
+
+    return FakeClient
+
+
+class BatchRewriteTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = use_temp_db(self)
+        self.doc = os.path.join(tmp, 'a.docx')
+        open(self.doc, 'w').close()
+        self.out = os.path.join(tmp, 'out')
+        for name, value in (
+            ('TokenBucket', _NoLimit),
+            ('read_docx_elements', lambda path: [{'type': 'text', 'text': '字' * 1200}]),
+            ('generate_docx', lambda *args, **kwargs: None),
+        ):
+            patcher = mock.patch.object(api, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.api = api.Api()
+        self.addCleanup(self.api.cleanup)
+        self.api._apply_settings({
+            **self.api._settings,
+            'rewriteSavePath': self.out, 'apiBase': 'http://llm.test', 'apiKey': 'k', 'model': 'm',
+            'rewriteWorkers': 1,
+        })
+
+    def _create(self, n):
+        # publish_time 倒序处理，t0 最先
+        for i in range(n):
+            Article.create(group_id=str(i), url=f'https://www.toutiao.com/article/{i}/', title=f't{i}',
+                           publish_time=n - i, doc_path=self.doc, char_count=1200)
+
+    def test_aborts_after_consecutive_failures(self):
+        self._create(20)
+        with mock.patch.object(api, 'RewriteClient', _fake_client({f't{i}' for i in range(20)})):
+            result = self.api.batch_rewrite_articles()
+        self.assertTrue(result['aborted'])
+        self.assertFalse(result['stopped'])
+        self.assertEqual(result['success_count'], 0)
+        # 在途任务最多 rewriteWorkers * 2 个，中止后剩下的不再提交
+        self.assertGreaterEqual(result['fail_count'], 5)
+        self.assertLess(result['fail_count'], 8)
+        self.assertIn('中止', result['message'])
+
+    def test_success_disables_fail_fast(self):
+        # 有一篇成功说明配置没问题，之后的连续失败不触发中止
+        self._create(10)
+        with mock.patch.object(api, 'RewriteClient', _fake_client({f't{i}' for i in range(1, 10)})):
+            result = self.api.batch_rewrite_articles()
+        self.assertFalse(result['aborted'])
+        self.assertEqual((result['success_count'], result['fail_count']), (1, 9))
+        self.assertEqual(Article.select().where(Article.is_rewritten == True).count(), 1)  # noqa: E712
+
+    def test_stale_stop_flag_cleared(self):
+        # 上一次的停止信号不影响新一批
+        self._create(3)
+        self.api.stop_batch_rewrite()
+        with mock.patch.object(api, 'RewriteClient', _fake_client(set())):
+            result = self.api.batch_rewrite_articles()
+        self.assertFalse(result['stopped'])
+        self.assertEqual(result['success_count'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
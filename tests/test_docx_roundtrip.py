@@ -0,0 +1,47 @@
+"""
+docx 生成 / 读回测试：读回的正文字数需与下载时 text_char_count 的统计一致
+运行：python -m unittest discover tests
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from article_downloader import generate_docx, read_docx_elements, text_char_count  # noqa: E402
+
+
+class DocxRoundtripTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_failed_image_placeholder_not_counted(self):
+        elements = [
+            {'type': 'text', 'text': '第一段正文'},
+            {'type': 'image', 'data': b'not an image'},  # 插入失败，写入占位段落
+            {'type': 'text', 'text': '第二段'},
+        ]
+        path = os.path.join(self.tmp, 'a.docx')
+        generate_docx(elements, path)
+
+        read_back = read_docx_elements(path)
+        self.assertEqual(text_char_count(read_back), text_char_count(elements))
+        self.assertEqual([e['type'] for e in read_back], ['text', 'image', 'text'])
+
+    def test_placeholder_written_again_on_regenerate(self):
+        path = os.path.join(self.tmp, 'a.docx')
+        generate_docx([{'type': 'image', 'data': None}, {'type': 'text', 'text': '正文'}], path)
+        again = os.path.join(self.tmp, 'sub', 'b.docx')
+        generate_docx(read_docx_elements(path), again)
+        self.assertEqual(read_docx_elements(again), read_docx_elements(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+批量下载 / 链接导入测试（下载器用假实现替换，不启动浏览器）
+运行：python -m unittest discover tests
+"""
+
+import asyncio
+import unittest
+from unittest import mock
+
+from support import use_temp_db
+
+import api  # noqa: E402
+from models import Article  # noqa: E402
+
+
+class _FakeDownloader:
+    """id 小于 slow_from 的文章很快下载完，其余一直挂起直到被取消；fail 中的抛错"""
+
+    slow_from = 100
+    fail = ()
+    cancelled = []
+
+    async def start(self, headless=True):
+        pass
+
+    async def close(self):
+        pass
+
+    async def download_with_count(self, article_url, **kwargs):
+        n = int(article_url.rstrip('/').split('/')[-1])
+        try:
+            await asyncio.sleep(0.01 if n < self.slow_from else 60)
+        except asyncio.CancelledError:
+            self.cancelled.append(n)
+            raise
+        if n in self.fail:
+            raise RuntimeError('页面加载失败')
+        return f'/docs/{n}.docx', 1000 + n
+
+
+class IntSettingTest(unittest.TestCase):
+
+    def test_values(self):
+        for raw, expected in ((8, 8), ('6', 6), ('', 4), (None, 4), ('abc', 4), (0, 1), (-3, 1), (99, 16)):
+            self.assertEqual(api._int_setting({'n': raw}, 'n', 4, 1, 16), expected, raw)
+        self.assertEqual(api._int_setting({}, 'n', 4, 1, 16), 4)
+
+
+class BatchDownloadTest(unittest.TestCase):
+
+    def setUp(self):
+        use_temp_db(self)
+        _FakeDownloader.cancelled = []
+        patcher = mock.patch.object(api, 'ArticleDownloader', _FakeDownloader)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.api = api.Api()
+        self.addCleanup(self.api.cleanup)
+        self.api._apply_settings({**self.api._settings, 'articleSavePath': '/docs', 'downloadConcurrency': 3})
+
+    def _create(self, n):
+        # 文章 id 与链接中的序号一致（从 1 开始）
+        return [
+            Article.create(group_id=str(i), url=f'https://www.toutiao.com/article/{i}/', title=f't{i}').id
+            for i in range(1, n + 1)
+        ]
+
+    def test_results_written_back(self):
+        ids = self._create(6)
+        with mock.patch.object(_FakeDownloader, 'fail', (4,)):
+            result = self.api.batch_download_articles(ids + [999])
+        self.assertEqual((result['success_count'], result['fail_count']), (5, 2))
+        by_id = {r['id']: r for r in result['results']}
+        self.assertEqual(by_id[999]['message'], '文章不存在')
+        self.assertEqual(by_id[4]['message'], '页面加载失败')
+        self.assertEqual(by_id[2]['doc_path'], '/docs/2.docx')
+        rows = dict(Article.select(Article.id, Article.char_count).where(Article.doc_path != '').tuples())
+        self.assertEqual(rows, {i: 1000 + i for i in ids if i != 4})
+
+    def test_timeout_keeps_finished_and_cancels_rest(self):
+        ids = self._create(8)
+        with mock.patch.object(api, '_DOWNLOAD_ROUND_TIMEOUT', 0.2), \
+                mock.patch.object(_FakeDownloader, 'slow_from', 5):
+            result = self.api.batch_download_articles(ids)
+        self.assertTrue(result['message'].startswith('下载超时'))
+        self.assertEqual((result['success_count'], result['fail_count']), (4, 4))
+        # 并发 3：5、6、7 下载中被取消，8 还在等信号量，没有开始
+        self.assertEqual(sorted(_FakeDownloader.cancelled), [5, 6, 7])
+        self.assertEqual(
+            {r['id']: r['message'] for r in result['results'] if not r['success']},
+            {i: '下载超时，已取消' for i in (5, 6, 7, 8)},
+        )
+        # 超时前完成的照常回写
+        self.assertEqual(Article.select().where(Article.doc_path != '').count(), 4)
+
+    def test_download_all_timeout(self):
+        self._create(12)
+        with mock.patch.object(api, '_DOWNLOAD_ROUND_TIMEOUT', 0.2), \
+                mock.patch.object(_FakeDownloader, 'slow_from', 10):
+            result = self.api.download_all_articles()
+        self.assertTrue(result['message'].startswith('下载超时'))
+        self.assertEqual((result['success_count'], result['fail_count']), (9, 3))
+        self.assertEqual(Article.select().where(Article.doc_path != '').count(), 9)
+
+
+class ImportUrlsTest(unittest.TestCase):
+
+    def setUp(self):
+        use_temp_db(self)
+        self.api = api.Api()
+        self.addCleanup(self.api.cleanup)
+
+    def test_skips_existing_ids_and_urls(self):
+        urls = [f'https://www.toutiao.com/article/74730020259275{i:05d}/' for i in range(3)]
+        result = self.api.import_article_urls('\n'.join(urls + [urls[0], 'junk']))
+        self.assertEqual((result['added'], result['skipped'], result['invalid']), (3, 1, 1))
+
+        # 同一 group_id 的另一种链接写法按已存在跳过
+        again = self.api.import_article_urls('\n'.join([urls[1], 'https://www.toutiao.com/a7473002025927500002/']))
+        self.assertEqual((again['added'], again['skipped']), (0, 2))
+        self.assertEqual(Article.select().count(), 3)
+
+    def test_http_https_variants_deduplicated(self):
+        Article.create(group_id='h1', url='http://feed.huiwen.co/y/q', title='x')
+        Article.create(group_id='pp', url='https://m.people.cn/n/zz', title='x')
+        result = self.api.import_article_urls('\n'.join([
+            'https://feed.huiwen.co/y/q',
+            'http://m.people.cn/n/zz',
+            'http://m.people.cn/n/new1',
+            'http://feed.huiwen.co/x/abc?z=1',
+            'https://feed.huiwen.co/x/abc?z=1',
+        ]))
+        self.assertEqual((result['added'], result['skipped']), (2, 3))
+        self.assertEqual(Article.select().count(), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
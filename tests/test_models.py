@@ -0,0 +1,120 @@
+"""
+BatchCommitter 与批量写库函数测试
+运行：python -m unittest discover tests
+"""
+
+import threading
+import unittest
+
+from support import use_temp_db
+
+from models import Article, BatchCommitter, apply_article_changes, set_doc_paths  # noqa: E402
+
+
+class BatchCommitterTest(unittest.TestCase):
+
+    def setUp(self):
+        # 提交在 db_session() 里执行，同样指向临时库
+        use_temp_db(self)
+
+    def test_close_flushes_pending_items(self):
+        batches = []
+        # interval 足够长，条目只能靠 close() 提交
+        committer = BatchCommitter(batches.append, interval=60)
+        for i in range(5):
+            committer.put(i)
+        self.assertEqual(committer.close(), [])
+        self.assertEqual(batches, [[0, 1, 2, 3, 4]])
+
+    def test_batches_split_at_max_batch(self):
+        batches = []
+        committer = BatchCommitter(batches.append, max_batch=3, interval=60)
+        for i in range(7):
+            committer.put(i)
+        committer.close()
+        self.assertEqual([len(b) for b in batches], [3, 3, 1])
+        self.assertEqual(sum(batches, []), list(range(7)))
+
+    def test_failed_batch_retried_once(self):
+        calls = []
+
+        def flaky(batch):
+            calls.append(list(batch))
+            if len(calls) == 1:
+                raise RuntimeError('database is locked')
+
+        committer = BatchCommitter(flaky, interval=60, retry_delay=0)
+        committer.put('a')
+        self.assertEqual(committer.close(), [])
+        self.assertEqual(calls, [['a'], ['a']])
+
+    def test_close_returns_items_that_never_committed(self):
+        def broken(batch):
+            if 'bad' in batch:
+                raise RuntimeError('disk I/O error')
+
+        committer = BatchCommitter(broken, max_batch=2, interval=60, retry_delay=0)
+        for item in ('ok1', 'ok2', 'bad', 'x'):
+            committer.put(item)
+        self.assertEqual(committer.close(), ['bad', 'x'])
+
+    def test_put_from_many_threads(self):
+        batches = []
+        committer = BatchCommitter(batches.append, max_batch=50, interval=60)
+        threads = [threading.Thread(target=lambda n=n: [committer.put((n, i)) for i in range(100)]) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        committer.close()
+        self.assertEqual(len(sum(batches, [])), 800)
+
+
+class ArticleWriteTest(unittest.TestCase):
+
+    def setUp(self):
+        use_temp_db(self)
+
+    def _create(self, n):
+        return [
+            Article.create(group_id=str(i), url=f'https://www.toutiao.com/article/{i}/', title=f't{i}').id
+            for i in range(n)
+        ]
+
+    def test_set_doc_paths_across_chunks(self):
+        # 每 150 行一条 UPDATE，320 行跨三批
+        ids = self._create(320)
+        set_doc_paths([(aid, f'/docs/{aid}.docx', aid * 10) for aid in ids])
+        rows = list(Article.select(Article.id, Article.doc_path, Article.char_count).tuples())
+        self.assertEqual(len(rows), 320)
+        for aid, doc_path, char_count in rows:
+            self.assertEqual(doc_path, f'/docs/{aid}.docx')
+            self.assertEqual(char_count, aid * 10)
+
+    def test_set_doc_paths_leaves_other_rows(self):
+        ids = self._create(3)
+        set_doc_paths([(ids[1], '/docs/b.docx', 42)])
+        self.assertEqual(Article.get_by_id(ids[0]).doc_path, '')
+        self.assertEqual(Article.get_by_id(ids[1]).doc_path, '/docs/b.docx')
+
+    def test_apply_article_changes(self):
+        ids = self._create(4)
+        apply_article_changes([('rewritten', ids[0]), ('deleted', ids[1]), ('rewritten', ids[2])])
+        self.assertEqual(
+            set(Article.select(Article.id).where(Article.is_rewritten == True).tuples()),  # noqa: E712
+            {(ids[0],), (ids[2],)},
+        )
+        self.assertIsNone(Article.get_or_none(Article.id == ids[1]))
+        self.assertFalse(Article.get_by_id(ids[3]).is_rewritten)
+
+    def test_committer_with_set_doc_paths(self):
+        ids = self._create(5)
+        committer = BatchCommitter(set_doc_paths, interval=60)
+        for aid in ids:
+            committer.put((aid, f'/docs/{aid}.docx', 1000))
+        self.assertEqual(committer.close(), [])
+        self.assertEqual(Article.select().where(Article.char_count == 1000).count(), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
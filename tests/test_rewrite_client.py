@@ -0,0 +1,242 @@
+"""
+改写请求的重试、退避、限流冷却和令牌桶测试（不访问网络，HTTP 响应用假 session 给出）
+运行：python -m unittest discover tests
+"""
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+import requests
+
+import support  # noqa: F401  把 backend 加入 sys.path
+
+import rewrite_client as rc  # noqa: E402
+
+
+def _response(status, headers=None, body=b'{}'):
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers.update(headers or {})
+    resp._content = body
+    resp.url = 'http://llm.test/chat/completions'
+    return resp
+
+
+def _http_error(status, headers=None):
+    return requests.exceptions.HTTPError(response=_response(status, headers))
+
+
+class _FakeSession:
+    """按顺序返回预设响应，记录每次请求的时间"""
+
+    def __init__(self, responses):
+        self._responses = list(responses)
+        self.times = []
+
+    def post(self, url, **kwargs):
+        self.times.append(time.monotonic())
+        return self._responses.pop(0)
+
+
+class RetryableErrorTest(unittest.TestCase):
+
+    def test_classification(self):
+        for exc in (_http_error(429), _http_error(503), TimeoutError(), ValueError('段落数不一致'),
+                    requests.exceptions.ConnectionError()):
+            self.assertTrue(rc.is_retryable_error(exc), exc)
+        for exc in (_http_error(401), _http_error(400), rc.SensitiveContentError('x'), RuntimeError('x')):
+            self.assertFalse(rc.is_retryable_error(exc), exc)
+
+    def test_backoff_delay_capped(self):
+        with mock.patch.object(rc.random, 'random', return_value=0.0):
+            self.assertEqual([rc.backoff_delay(n, base=2, cap=10) for n in range(1, 6)], [2, 4, 8, 10, 10])
+
+
+class CallWithBackoffTest(unittest.TestCase):
+
+    def setUp(self):
+        # 抖动置 0、冷却换成独立实例，避免测试之间互相影响
+        patcher = mock.patch.object(rc.random, 'random', return_value=0.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(rc, '_llm_cooldown', rc._Cooldown())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retries_until_success(self):
+        calls = []
+
+        def func():
+            calls.append(1)
+            if len(calls) < 3:
+                raise TimeoutError()
+            return 'ok'
+
+        self.assertEqual(rc.call_with_backoff(func, max_retries=3, base=0.01, cap=0.01), 'ok')
+        self.assertEqual(len(calls), 3)
+
+    def test_gives_up_after_max_retries(self):
+        calls = []
+
+        def func():
+            calls.append(1)
+            raise _http_error(503)
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            rc.call_with_backoff(func, max_retries=2, base=0.01, cap=0.01)
+        self.assertEqual(len(calls), 2)
+
+    def test_non_retryable_raised_immediately(self):
+        calls = []
+
+        def func():
+            calls.append(1)
+            raise rc.SensitiveContentError('x')
+
+        with self.assertRaises(rc.SensitiveContentError):
+            rc.call_with_backoff(func, max_retries=5, base=0.01, cap=0.01)
+        self.assertEqual(len(calls), 1)
+
+    def test_no_retry_past_deadline(self):
+        calls = []
+
+        def func():
+            calls.append(1)
+            raise TimeoutError()
+
+        with self.assertRaises(TimeoutError):
+            rc.call_with_backoff(func, max_retries=5, base=10, cap=10, deadline=time.monotonic() + 1)
+        self.assertEqual(len(calls), 1)
+
+    def test_cancel_interrupts_backoff(self):
+        cancel = threading.Event()
+        threading.Timer(0.05, cancel.set).start()
+
+        def func():
+            raise TimeoutError()
+
+        started = time.monotonic()
+        with self.assertRaises(rc.RewriteCancelled):
+            rc.call_with_backoff(func, max_retries=3, base=30, cap=30, cancel=cancel)
+        self.assertLess(time.monotonic() - started, 5)
+
+
+class RetryAfterTest(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(rc.random, 'random', return_value=0.0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _client(self, responses, cooldown):
+        patcher = mock.patch.object(rc, '_llm_cooldown', cooldown)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        client = rc.RewriteClient('http://llm.test', 'k', 'm', timeout=5)
+        client._session = _FakeSession(responses)
+        return client
+
+    def test_parse_retry_after(self):
+        self.assertEqual(rc._parse_retry_after(_response(429, {'Retry-After': '7'})), 7.0)
+        self.assertIsNone(rc._parse_retry_after(_response(429, {'Retry-After': 'soon'})))
+        self.assertIsNone(rc._parse_retry_after(_response(429)))
+        when = rc._parse_retry_after(_response(429, {'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}))
+        self.assertEqual(when, 0.0)  # 过去的时间点按 0 处理
+
+    def test_honours_retry_after(self):
+        client = self._client([_response(429, {'Retry-After': '0.3'}), _response(200)], rc._Cooldown())
+        resp = client._request_with_retry('http://llm.test/chat/completions', {}, {})
+        self.assertEqual(resp.status_code, 200)
+        times = client._session.times
+        self.assertGreaterEqual(times[1] - times[0], 0.25)
+
+    def test_retry_after_capped(self):
+        # Retry-After 一小时，冷却按上限截断
+        with mock.patch.object(rc, '_COOLDOWN_CAP', 0.2):
+            client = self._client([_response(429, {'Retry-After': '3600'}), _response(200)], rc._Cooldown(max_seconds=0.2))
+            started = time.monotonic()
+            resp = client._request_with_retry('http://llm.test/chat/completions', {}, {})
+        self.assertEqual(resp.status_code, 200)
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_cooldown_past_deadline_fails_fast(self):
+        client = self._client([_response(429, {'Retry-After': '30'}), _response(200)], rc._Cooldown())
+        started = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            client._request_with_retry('http://llm.test/chat/completions', {}, {}, deadline=time.monotonic() + 5)
+        self.assertLess(time.monotonic() - started, 1)
+
+
+class CooldownTest(unittest.TestCase):
+
+    def test_extend_is_capped(self):
+        cooldown = rc._Cooldown(max_seconds=0.1)
+        cooldown.extend(3600)
+        started = time.monotonic()
+        cooldown.wait()
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_shared_across_threads(self):
+        cooldown = rc._Cooldown()
+        cooldown.extend(0.2)
+        waited = []
+
+        def worker():
+            started = time.monotonic()
+            cooldown.wait()
+            waited.append(time.monotonic() - started)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(waited), 4)
+        self.assertTrue(all(w >= 0.15 for w in waited), waited)
+
+    def test_wait_cancelled(self):
+        cooldown = rc._Cooldown()
+        cooldown.extend(30)
+        cancel = threading.Event()
+        threading.Timer(0.05, cancel.set).start()
+        with self.assertRaises(rc.RewriteCancelled):
+            cooldown.wait(cancel)
+
+    def test_wait_beyond_deadline_raises_without_sleeping(self):
+        cooldown = rc._Cooldown()
+        cooldown.extend(30)
+        started = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            cooldown.wait(deadline=time.monotonic() + 1)
+        self.assertLess(time.monotonic() - started, 0.5)
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_burst_then_rate(self):
+        bucket = rc.TokenBucket(rate=20, capacity=2)
+        started = time.monotonic()
+        bucket.acquire()
+        bucket.acquire()
+        self.assertLess(time.monotonic() - started, 0.05)  # 突发量内不等待
+        for _ in range(4):
+            bucket.acquire()
+        # 之后每个令牌 1/20 秒
+        self.assertGreaterEqual(time.monotonic() - started, 0.18)
+
+    def test_threads_share_rate(self):
+        bucket = rc.TokenBucket(rate=50, capacity=1)
+        started = time.monotonic()
+        threads = [threading.Thread(target=lambda: [bucket.acquire() for _ in range(5)]) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        # 20 个令牌，首个立即可用，其余按 50/s 生成
+        self.assertGreaterEqual(time.monotonic() - started, 0.36)
+
+
+if __name__ == '__main__':
+    unittest.main()